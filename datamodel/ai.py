@@ -0,0 +1,220 @@
+"""
+    Built-in player for both sides of the game.
+
+    Iterative deepening negamax with alpha-beta pruning over the bitboard
+    engine. The positions are hashed with Zobrist keys into a
+    transposition table of each search (the threads of a process search
+    at once). Each search stops when its time budget runs out, keeping
+    the best move of the last finished depth. If the tablebase is built,
+    its moves are played instead.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from datamodel import bitboard, constants, tablebase
+from datamodel.models import GameStatus, Move
+
+WIN = 10000
+MAX_DEPTH = 64
+TABLE_SIZE = 1 << 20
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Zobrist keys: a cat in a cell, the mouse in a cell and the cats turn
+_random = random.Random(2019)
+CAT_KEYS = tuple(_random.getrandbits(64) for _ in range(bitboard.N_CELLS))
+MOUSE_KEYS = tuple(_random.getrandbits(64) for _ in range(bitboard.N_CELLS))
+TURN_KEY = _random.getrandbits(64)
+
+
+class Timeout(Exception):
+    pass
+
+
+def to_table(score, ply):
+    # A win found at any ply is stored as a distance from the position,
+    # so it is right when the position comes again at another ply
+    if score >= WIN - MAX_DEPTH:
+        return score + ply
+    if score <= MAX_DEPTH - WIN:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    if score >= WIN - MAX_DEPTH:
+        return score - ply
+    if score <= MAX_DEPTH - WIN:
+        return score + ply
+    return score
+
+
+def zobrist(cats, mouse, cat_turn):
+    key = MOUSE_KEYS[mouse] ^ (TURN_KEY if cat_turn else 0)
+    for cell in bitboard.cells(cats):
+        key ^= CAT_KEYS[cell]
+    return key
+
+
+def evaluate(cats, mouse, cat_turn):
+    """ Score of a position for the side to move """
+    top_row = bitboard.lowest_cell(cats) >> 3
+    bottom_row = (cats.bit_length() - 1) >> 3
+    freedom = len(bitboard.mouse_moves(cats, mouse))
+    # The cats want the mouse far below them, with little room to move,
+    # and the cats close together
+    score = 10 * ((mouse >> 3) - top_row) - 4 * freedom \
+        - 3 * (bottom_row - top_row)
+    return score if cat_turn else -score
+
+
+class Search:
+    def __init__(self, budget):
+        self.deadline = time.monotonic() + budget
+        self.nodes = 0
+        self.table = {}
+        # Best move of the root in the last depth searched to the end
+        self.root_move = None
+
+    def ordered_moves(self, cats, mouse, cat_turn, first):
+        moves = bitboard.legal_moves(cats, mouse, cat_turn)
+        if cat_turn:
+            # Rear cats first, they keep the line closed
+            moves.sort(key=lambda move: move[0])
+        else:
+            # Going up first, it is the way out
+            moves.sort(key=lambda move: move[1])
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def negamax(self, cats, mouse, cat_turn, key, depth, ply, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.monotonic() > self.deadline:
+            raise Timeout()
+
+        result = bitboard.winner(cats, mouse)
+        if result is not None:
+            return WIN - ply if result == cat_turn else ply - WIN
+        if depth == 0:
+            return evaluate(cats, mouse, cat_turn)
+
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, score, flag, first = entry
+            score = from_table(score, ply)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER and score >= beta:
+                    return score
+                if flag == UPPER and score <= alpha:
+                    return score
+
+        moves = self.ordered_moves(cats, mouse, cat_turn, first)
+        if not moves:
+            # The side to move is blocked and loses
+            return ply - WIN
+
+        original_alpha = alpha
+        best_score, best_move = -WIN - 1, None
+        for origin, target in moves:
+            if cat_turn:
+                child = (cats ^ (1 << origin) ^ (1 << target), mouse)
+                child_key = key ^ CAT_KEYS[origin] ^ CAT_KEYS[target]
+            else:
+                child = (cats, target)
+                child_key = key ^ MOUSE_KEYS[origin] ^ MOUSE_KEYS[target]
+            score = -self.negamax(child[0], child[1], not cat_turn,
+                                  child_key ^ TURN_KEY, depth - 1, ply + 1,
+                                  -beta, -alpha)
+            if score > best_score:
+                best_score, best_move = score, (origin, target)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if len(self.table) >= TABLE_SIZE:
+            self.table.clear()
+        self.table[key] = (depth, to_table(best_score, ply), flag, best_move)
+        if ply == 0:
+            self.root_move = best_move
+        return best_score
+
+    def best_move(self, cats, mouse, cat_turn):
+        moves = bitboard.legal_moves(cats, mouse, cat_turn)
+        if not moves:
+            return None
+        best = moves[0]
+        key = zobrist(cats, mouse, cat_turn)
+        try:
+            for depth in range(1, MAX_DEPTH + 1):
+                score = self.negamax(cats, mouse, cat_turn, key, depth, 0,
+                                     -WIN - 1, WIN + 1)
+                best = self.root_move or best
+                if abs(score) >= WIN - MAX_DEPTH:
+                    # The end of the game is already in sight
+                    break
+        except Timeout:
+            pass
+        return best
+
+
+def choose_move(game, budget=None):
+    """ (origin, target) for the side to move of a Game, or None """
+    cats, mouse = game.get_cats_mask(), int(game.mouse)
+    if bitboard.winner(cats, mouse) is not None:
+        return None
+    move = tablebase.best_move(game)
+    if move is not None:
+        return move
+    if budget is None:
+        budget = settings.BOT_MOVE_TIME
+    return Search(budget).best_move(cats, mouse, game.cat_turn)
+
+
+# Id of the bot user, read once by each process
+_bot_id = None
+
+
+def get_bot_user():
+    """ The user of the bot, created by a migration. It is inactive and
+    without password, so nobody can sign up or log in as it """
+    global _bot_id
+    user, _ = User.objects.get_or_create(
+        username=constants.BOT_USERNAME, is_active=False,
+        defaults={'password': make_password(None)})
+    _bot_id = user.id
+    return user
+
+
+def get_bot_id():
+    if _bot_id is None:
+        get_bot_user()
+    return _bot_id
+
+
+def play_bot_move(game):
+    """ If it is the turn of the bot, it moves like any other player. The
+    players are compared by id, so the move of a person costs no query """
+    if game.status != GameStatus.ACTIVE:
+        return None
+    player_id = game.cat_user_id if game.cat_turn else game.mouse_user_id
+    if player_id != get_bot_id():
+        return None
+    move = choose_move(game)
+    if move is None:
+        return None
+    return Move.objects.create(game=game, player_id=player_id,
+                               origin=move[0], target=move[1])
@@ -0,0 +1,168 @@
+"""
+    Microbenchmarks of the rules of the game and the models, to compare
+    changes of the rules engine.
+
+    The positions come from random games played from the initial
+    position, so they are the ones the site sees. Each benchmark calls
+    its function on every position, several rounds, and keeps the
+    fastest round, in nanoseconds per call. The results are compared
+    with a baseline stored as JSON: a benchmark more than `threshold`
+    slower than its baseline is a regression. The replays read finished
+    games packed as the pack_moves command leaves them, and 'replay'
+    plays the whole moves of each one with the rules, as the import
+    does.
+"""
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+from datamodel import bitboard, importer, movelog
+from datamodel.models import Game, GameStatus, Move
+
+POSITIONS = 10000
+GAMES = 500
+ROUNDS = 5
+SEED = 2019
+NAMES = ('Game.validate', 'Game.cell_is_valid', 'Game.mouse_alternatives',
+         'Game.mouse_is_trapped', 'Game.get_game_cells', 'Move.validate',
+         'Game.get_moves', 'Game.get_position', 'replay')
+
+
+def random_game(rng):
+    """ Moves of a random game, until it ends or a side can't move """
+    cats, mouse, cat_turn = importer.INITIAL_CATS, importer.INITIAL_MOUSE, True
+    moves = []
+    while bitboard.winner(cats, mouse) is None:
+        legal = bitboard.legal_moves(cats, mouse, cat_turn)
+        if not legal:
+            break
+        origin, target = rng.choice(legal)
+        moves.append((origin, target))
+        cats, mouse, cat_turn = bitboard.apply(cats, mouse, cat_turn,
+                                               origin, target)
+    return moves
+
+
+def random_positions(rng, count):
+    """ (game, move) of `count` positions of random games, with a legal
+    move of the side to move if it has one. Nothing is saved """
+    cat_user, mouse_user = User(id=1), User(id=2)
+    positions = []
+    while len(positions) < count:
+        moves = random_game(rng)
+        # Any position before the end
+        moves = moves[:rng.randrange(len(moves))]
+        _, final, cat_turn, _, _ = importer.play(
+            {'cat_user': 'cat', 'mouse_user': 'mouse', 'moves': moves})
+        game = Game(cat_user=cat_user, mouse_user=mouse_user,
+                    cat_turn=cat_turn, status=GameStatus.ACTIVE, **final)
+        legal = bitboard.legal_moves(game.get_cats_mask(), game.mouse,
+                                     cat_turn)
+        origin, target = rng.choice(legal) if legal else (game.mouse, 0)
+        player = cat_user if cat_turn else mouse_user
+        positions.append((game, Move(game=game, player=player,
+                                     origin=origin, target=target)))
+    return positions
+
+
+def packed_games(rng, count):
+    """ (game, ply) of `count` finished random games, packed with their
+    snapshots, and a random ply of each one. Nothing is saved """
+    games = []
+    for _ in range(count):
+        moves = random_game(rng)
+        _, final, cat_turn, _, _ = importer.play(
+            {'cat_user': 'cat', 'mouse_user': 'mouse', 'moves': moves})
+        game = Game(cat_turn=cat_turn, status=GameStatus.FINISHED,
+                    packed_moves=movelog.pack(moves), **final)
+        game.snapshots = movelog.snapshots(game.get_cats_mask(),
+                                           game.mouse, moves)
+        games.append((game, rng.randrange(len(moves) + 1)))
+    return games
+
+
+def validate_move(move):
+    try:
+        return move.validate()
+    except ValidationError:
+        return False
+
+
+def replay(moves):
+    return importer.play({'cat_user': 'cat', 'mouse_user': 'mouse',
+                          'moves': moves})
+
+
+def get_benchmarks(positions, games):
+    """ name -> (function, arguments of each call) """
+    boards = [game for game, _ in positions]
+    cells = [(game, cell) for game in boards for cell in
+             game.get_array_positions()]
+    return {
+        'Game.validate': (Game.validate, [(game,) for game in boards]),
+        'Game.cell_is_valid': (Game.cell_is_valid, cells),
+        'Game.mouse_alternatives': (Game.mouse_alternatives,
+                                    [(game,) for game in boards]),
+        # It marks the game finished if the mouse is trapped, so it is
+        # called on copies
+        'Game.mouse_is_trapped': (
+            Game.mouse_is_trapped,
+            [(Game(cat1=game.cat1, cat2=game.cat2, cat3=game.cat3,
+                   cat4=game.cat4, mouse=game.mouse),) for game in boards]),
+        'Game.get_game_cells': (Game.get_game_cells,
+                                [(game,) for game in boards]),
+        'Move.validate': (validate_move, [(move,) for _, move in positions]),
+        'Game.get_moves': (Game.get_moves, [(game,) for game, _ in games]),
+        'Game.get_position': (Game.get_position, games),
+        'replay': (replay, [(game.get_moves(),) for game, _ in games]),
+    }
+
+
+def time_calls(function, calls, rounds):
+    # Nanoseconds per call of the fastest round
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for args in calls:
+            function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e9 / len(calls)
+
+
+def run(positions=POSITIONS, games=GAMES, rounds=ROUNDS, seed=SEED,
+        names=None):
+    """ Nanoseconds per call of each benchmark (or of the ones in
+    `names`). The same seed times the same positions """
+    rng = random.Random(seed)
+    benchmarks = get_benchmarks(random_positions(rng, positions),
+                                packed_games(rng, games))
+    return {name: time_calls(function, calls, rounds)
+            for name, (function, calls) in benchmarks.items()
+            if names is None or name in names}
+
+
+def load_baseline(path):
+    with open(path) as data:
+        return json.load(data)
+
+
+def save_baseline(results, path):
+    with open(path, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+def compare(results, baseline, threshold):
+    """ (name, ns per call, baseline or None, change, regression) of each
+    result. The change is the fraction slower than the baseline """
+    rows = []
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        change = value / base - 1 if base else None
+        rows.append((name, value, base, change,
+                     change is not None and change > threshold))
+    return rows
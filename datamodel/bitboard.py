@@ -0,0 +1,157 @@
+"""
+    Bitboard rules engine for the cat and mouse game.
+
+    A position is three values:
+    - cats: 64 bit mask, bit i is set if there is a cat in the cell i
+    - mouse: index of the cell of the mouse
+    - cat_turn: True if the cats move, False if the mouse moves
+
+    The cells are numbered as in datamodel.models (0 is the top left
+    corner, 63 the bottom right one). Only the dark cells are playable.
+    Every table is computed once when the module is imported, so the
+    checks below are a few bit operations and don't build any list.
+"""
+
+MIN_CELL = 0
+MAX_CELL = 63
+N_CELLS = 64
+
+
+def _is_dark(cell):
+    if cell < MIN_CELL or cell > MAX_CELL:
+        return False
+    return (cell // 8) % 2 == cell % 2
+
+
+def _neighbours(cell, steps):
+    # Diagonal neighbours of a cell. A step can't wrap around the board
+    targets = []
+    if not _is_dark(cell):
+        return tuple(targets)
+    for step in steps:
+        target = cell + step
+        if _is_dark(target) and abs(target % 8 - cell % 8) == 1:
+            targets.append(target)
+    return tuple(targets)
+
+
+def _to_mask(cells):
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+
+# Cells a cat (forward only) or the mouse (any direction) can reach
+CAT_TARGETS = tuple(_neighbours(cell, (7, 9)) for cell in range(N_CELLS))
+MOUSE_TARGETS = tuple(_neighbours(cell, (-9, -7, 7, 9))
+                      for cell in range(N_CELLS))
+
+DARK_CELLS = _to_mask(cell for cell in range(N_CELLS) if _is_dark(cell))
+CAT_MOVES = tuple(_to_mask(targets) for targets in CAT_TARGETS)
+MOUSE_MOVES = tuple(_to_mask(targets) for targets in MOUSE_TARGETS)
+
+
+def cell_is_valid(cell):
+    return MIN_CELL <= cell <= MAX_CELL and bool(DARK_CELLS >> cell & 1)
+
+
+def cells_are_valid(mask):
+    return mask & ~DARK_CELLS == 0
+
+
+def cats_mask(cat1, cat2, cat3, cat4):
+    return (1 << cat1) | (1 << cat2) | (1 << cat3) | (1 << cat4)
+
+
+def cells(mask):
+    # Cells set in a mask, from the lowest to the highest
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(low.bit_length() - 1)
+        mask ^= low
+    return result
+
+
+def lowest_cell(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+def mouse_is_trapped(cats, mouse):
+    # Every cell the mouse could reach has a cat
+    return MOUSE_MOVES[mouse] & ~cats == 0
+
+
+def mouse_at_top(cats, mouse):
+    # The mouse is in the same row or above the highest cat
+    return mouse >> 3 <= lowest_cell(cats) >> 3
+
+
+def winner(cats, mouse):
+    """ None while the game goes on, True if the cats win and False if
+    the mouse wins """
+    if mouse_is_trapped(cats, mouse):
+        return True
+    if mouse_at_top(cats, mouse):
+        return False
+    return None
+
+
+def cat_step_is_valid(cats, mouse, origin, target):
+    # A cat step from origin to an empty target, without checking that
+    # there is a cat in origin
+    if origin < MIN_CELL or origin > MAX_CELL:
+        return False
+    if target < MIN_CELL or target > MAX_CELL:
+        return False
+    free = ~(cats | (1 << mouse))
+    return bool((CAT_MOVES[origin] & free) >> target & 1)
+
+
+def cat_can_move(cats, mouse, origin, target):
+    if not cat_step_is_valid(cats, mouse, origin, target):
+        return False
+    return bool(cats >> origin & 1)
+
+
+def mouse_can_move(cats, mouse, origin, target):
+    if origin != mouse or target < MIN_CELL or target > MAX_CELL:
+        return False
+    return bool((MOUSE_MOVES[mouse] & ~cats) >> target & 1)
+
+
+def cat_moves(cats, mouse):
+    """ Every (origin, target) move the cats can do """
+    free = ~(cats | (1 << mouse))
+    moves = []
+    for origin in cells(cats):
+        for target in CAT_TARGETS[origin]:
+            if free >> target & 1:
+                moves.append((origin, target))
+    return moves
+
+
+def mouse_moves(cats, mouse):
+    """ Every (origin, target) move the mouse can do """
+    return [(mouse, target) for target in MOUSE_TARGETS[mouse]
+            if not cats >> target & 1]
+
+
+def legal_moves(cats, mouse, cat_turn):
+    if cat_turn:
+        return cat_moves(cats, mouse)
+    return mouse_moves(cats, mouse)
+
+
+def is_legal(cats, mouse, cat_turn, origin, target):
+    if cat_turn:
+        return cat_can_move(cats, mouse, origin, target)
+    return mouse_can_move(cats, mouse, origin, target)
+
+
+def apply(cats, mouse, cat_turn, origin, target):
+    """ Position after a move. The move must be legal """
+    if cat_turn:
+        return cats ^ (1 << origin) ^ (1 << target), mouse, False
+    return cats, target, True
@@ -1,7 +1,10 @@
 MSG_ERROR_INVALID_CELL = "Invalid cell for a cat or the mouse"
 MSG_ERROR_GAMESTATUS = "Game status not valid"
 MSG_ERROR_MOVE = "Move not allowed"
+MSG_ERROR_MOVE_CONFLICT = "The game changed before the move, try again"
 MSG_ERROR_NEW_COUNTER = "Insert not allowed"
 ERROR_MESSAGE_ID = "msg_error"
 GAME_SELECTED_SESSION_ID = "game_id"
 ERROR_NOT_FOUND = "Page not found"
+BOT_USERNAME = "mouse_cat_bot"
+MSG_ERROR_RESERVED_USERNAME = "This username is reserved"
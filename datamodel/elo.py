@@ -0,0 +1,36 @@
+"""
+    Elo ratings of the users, one as cat and one as mouse.
+
+    After each game the rating of the winner goes up and the one of the
+    loser goes down by the same points, more if the winner was expected
+    to lose.
+"""
+
+INITIAL = 1500.0
+K = 32
+
+
+def expected(rating, other):
+    # Expected score (0 to 1) of a player against another one
+    return 1 / (1 + 10 ** ((other - rating) / 400))
+
+
+def update(cat_rating, mouse_rating, cat_wins):
+    """ New (cat rating, mouse rating) of the two players of a game """
+    change = K * ((1 if cat_wins else 0) - expected(cat_rating, mouse_rating))
+    return cat_rating + change, mouse_rating - change
+
+
+def replay(games):
+    """ {user id: [cat rating, mouse rating]} after the games, an iterable
+    of (cat id, mouse id, cat_wins) in the order they were played. Only
+    the ratings are kept in memory, not the games """
+    ratings = {}
+    for cat, mouse, cat_wins in games:
+        if mouse is None:
+            continue
+        cat_ratings = ratings.setdefault(cat, [INITIAL, INITIAL])
+        mouse_ratings = ratings.setdefault(mouse, [INITIAL, INITIAL])
+        cat_ratings[0], mouse_ratings[1] = update(cat_ratings[0],
+                                                  mouse_ratings[1], cat_wins)
+    return ratings
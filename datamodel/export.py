@@ -0,0 +1,85 @@
+"""
+    Export of the games and their moves, as NDJSON (a JSON object per
+    game and line) or CSV (a row per game, the moves as "origin-target"
+    separated by spaces).
+
+    The games are read in chunks of consecutive ids and the moves of each
+    chunk with one more query, so the memory used doesn't depend on the
+    number of games.
+"""
+import csv
+import json
+
+from datamodel import movelog
+from datamodel.models import Game, Move
+
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 1000
+FIELDS = ('id', 'cat_user', 'mouse_user', 'status', 'cat_wins', 'cat_turn',
+          'cat1', 'cat2', 'cat3', 'cat4', 'mouse', 'moves')
+
+
+def iter_games(chunk_size=CHUNK_SIZE):
+    """ Dicts of the games, ordered by id, with their moves as a list of
+    [origin, target] """
+    last_id = 0
+    while True:
+        games = list(Game.objects.filter(id__gt=last_id).order_by('id')
+                     .values('id', 'cat_user__username',
+                             'mouse_user__username', 'status', 'cat_wins',
+                             'cat_turn', 'cat1', 'cat2', 'cat3', 'cat4',
+                             'mouse', 'packed_moves')[:chunk_size])
+        if not games:
+            return
+        moves = {}
+        for game in games:
+            if game['packed_moves'] is not None:
+                moves[game['id']] = [
+                    list(move) for move in
+                    movelog.unpack(game['packed_moves'])]
+            else:
+                moves[game['id']] = []
+        unpacked = [game['id'] for game in games
+                    if game['packed_moves'] is None]
+        if unpacked:
+            for game_id, origin, target in Move.objects \
+                    .filter(game_id__in=unpacked).order_by('game_id', 'id') \
+                    .values_list('game_id', 'origin', 'target') \
+                    .iterator(chunk_size=chunk_size):
+                moves[game_id].append([origin, target])
+        for game in games:
+            yield {'id': game['id'],
+                   'cat_user': game['cat_user__username'],
+                   'mouse_user': game['mouse_user__username'],
+                   'status': game['status'], 'cat_wins': game['cat_wins'],
+                   'cat_turn': game['cat_turn'], 'cat1': game['cat1'],
+                   'cat2': game['cat2'], 'cat3': game['cat3'],
+                   'cat4': game['cat4'], 'mouse': game['mouse'],
+                   'moves': moves[game['id']]}
+        if len(games) < chunk_size:
+            return
+        last_id = games[-1]['id']
+
+
+class Echo:
+    # File for csv.writer that returns the line instead of writing it
+    def write(self, value):
+        return value
+
+
+def export_lines(export_format, chunk_size=CHUNK_SIZE):
+    """ Lines of the export, each one ending in a new line """
+    if export_format not in FORMATS:
+        raise ValueError("Unknown format %s" % export_format)
+    games = iter_games(chunk_size)
+    if export_format == 'ndjson':
+        for game in games:
+            yield json.dumps(game, separators=(',', ':')) + "\n"
+        return
+
+    writer = csv.writer(Echo(), lineterminator="\n")
+    yield writer.writerow(FIELDS)
+    for game in games:
+        game['moves'] = " ".join("%d-%d" % tuple(move)
+                                 for move in game['moves'])
+        yield writer.writerow([game[field] for field in FIELDS])
@@ -0,0 +1,161 @@
+"""
+    Last state of the games, shared by the requests of this process.
+
+    Each committed move publishes the new state of its game (see
+    Game.get_state). The requests waiting for a game wake up at once and
+    answer with that state, so the players and the spectators of a game
+    don't read it from the DB. Only one of them reloads it from the DB
+    when it gets older than the max age that request allows.
+
+    With settings.GAME_HUB_SOCKET_DIR, the states are also sent to the
+    other processes (the gunicorn workers) of the machine. Every process
+    binds a Unix datagram socket in that directory and sends each state
+    to the sockets of the others.
+"""
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+MAX_GAMES = 10000
+MAX_MESSAGE = 65536
+
+
+class GameHub:
+    def __init__(self):
+        self.condition = threading.Condition()
+        # game id -> (state, time it was read or published)
+        self.states = OrderedDict()
+        self.socket_lock = threading.Lock()
+        self.pid = None
+        self.path = None
+        self.sender = None
+
+    def store(self, state):
+        # Keeps the state if it is not older than the known one. Returns
+        # True if it is newer
+        with self.condition:
+            game_id = state['id']
+            entry = self.states.get(game_id)
+            if entry is not None and entry[0]['version'] > state['version']:
+                return False
+            self.states[game_id] = (state, time.monotonic())
+            self.states.move_to_end(game_id)
+            if len(self.states) > MAX_GAMES:
+                self.states.popitem(last=False)
+            newer = entry is None or entry[0]['version'] < state['version']
+            if newer:
+                self.condition.notify_all()
+            return newer
+
+    def publish(self, state):
+        """ New state of a game, for this process and the others """
+        self.store(state)
+        self.broadcast(state)
+
+    def get_state(self, game_id, loader, max_age):
+        """ Last state of a game. It is read with loader() if it is unknown
+        or older than max_age seconds, and only by one request: the others
+        use the old one meanwhile """
+        self.listen()
+        now = time.monotonic()
+        with self.condition:
+            entry = self.states.get(game_id)
+            if entry is not None:
+                if now - entry[1] < max_age:
+                    return entry[0]
+                self.states[game_id] = (entry[0], now)
+        state = loader()
+        if state is not None:
+            self.store(state)
+        return state
+
+    def wait(self, game_id, version, timeout):
+        """ Waits until a state newer than `version` is published or the
+        timeout passes. Returns the last state known or None """
+        self.listen()
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                entry = self.states.get(game_id)
+                state = entry[0] if entry is not None else None
+                if state is not None and state['version'] > version:
+                    return state
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return state
+                self.condition.wait(remaining)
+
+    def clear(self):
+        with self.condition:
+            self.states.clear()
+
+    def listen(self):
+        # Binds the socket of this process, once per process (gunicorn
+        # forks the workers)
+        directory = settings.GAME_HUB_SOCKET_DIR
+        if not directory or self.pid == os.getpid():
+            return
+        with self.socket_lock:
+            if self.pid == os.getpid():
+                return
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, "%d.sock" % os.getpid())
+            if os.path.exists(path):
+                os.unlink(path)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(path)
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            # A full queue of a busy process drops the message, the
+            # waiters of that process will read the DB later
+            sender.setblocking(False)
+            self.path, self.sender = path, sender
+            thread = threading.Thread(target=self.receive, args=(receiver,),
+                                      daemon=True)
+            thread.start()
+            atexit.register(self.close, path)
+            self.pid = os.getpid()
+
+    def receive(self, receiver):
+        while True:
+            data = receiver.recv(MAX_MESSAGE)
+            try:
+                self.store(json.loads(data.decode('utf-8')))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def broadcast(self, state):
+        self.listen()
+        if self.pid != os.getpid():
+            return
+        directory = settings.GAME_HUB_SOCKET_DIR
+        data = json.dumps(state).encode('utf-8')
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if path == self.path or not name.endswith(".sock"):
+                continue
+            try:
+                self.sender.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The process is gone
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+
+    def close(self, path):
+        if self.pid == os.getpid():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+hub = GameHub()
@@ -0,0 +1,173 @@
+"""
+    Bulk import of games in the NDJSON format of datamodel.export.
+
+    The moves of each game are played from the initial position with the
+    rules of datamodel.bitboard, without queries, and the games that are
+    not valid are reported and skipped, as the ones with usernames that
+    can't sign up. The valid ones are inserted with bulk_create, a batch
+    of games and their moves at a time (the games one by one on the
+    databases that don't return the ids of a bulk insert), and the
+    finished ones are added to the stats of their players in order, as
+    the move that finishes a game does. The caller runs the import in a
+    transaction.
+"""
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from datamodel import bitboard, movelog
+from datamodel.models import Game, GameStatus, Move, UserStats
+
+BATCH_SIZE = 1000
+INITIAL_CELLS = (0, 2, 4, 6)
+INITIAL_CATS = bitboard.cats_mask(*INITIAL_CELLS)
+INITIAL_MOUSE = 59
+
+
+def check_username(username):
+    # The same rules as the users that sign up
+    if not isinstance(username, str):
+        raise ValueError("Username %r not valid" % (username,))
+    try:
+        User._meta.get_field('username').clean(username, None)
+    except ValidationError as err:
+        raise ValueError("Username %r not valid: %s" %
+                         (username, " ".join(err.messages)))
+
+
+def play(record):
+    """ Final position, status and winner of a game record, ValueError
+    if its moves or its data are not valid """
+    if not record.get('cat_user'):
+        raise ValueError("The game has no cat")
+    check_username(record['cat_user'])
+    if record.get('mouse_user'):
+        check_username(record['mouse_user'])
+    moves = [(int(origin), int(target))
+             for origin, target in record.get('moves', [])]
+    if moves and not record.get('mouse_user'):
+        raise ValueError("A game without mouse has moves")
+
+    cats, mouse, cat_turn = INITIAL_CATS, INITIAL_MOUSE, True
+    # Each of cat1..cat4 keeps following its cat
+    slots = list(INITIAL_CELLS)
+    cat_wins = None
+    for ply, (origin, target) in enumerate(moves):
+        if cat_wins is not None or \
+                not bitboard.is_legal(cats, mouse, cat_turn, origin, target):
+            raise ValueError("Move %d not allowed" % (ply + 1))
+        if cat_turn:
+            slots[slots.index(origin)] = target
+        cats, mouse, cat_turn = bitboard.apply(cats, mouse, cat_turn,
+                                               origin, target)
+        cat_wins = bitboard.winner(cats, mouse)
+
+    if not record.get('mouse_user'):
+        status = GameStatus.CREATED
+    elif cat_wins is None:
+        status = GameStatus.ACTIVE
+    else:
+        status = GameStatus.FINISHED
+    if record.get('status', status) != status:
+        raise ValueError("The status doesn't match the moves")
+    final = dict(zip(('cat1', 'cat2', 'cat3', 'cat4'), slots), mouse=mouse)
+    for field, value in final.items():
+        if record.get(field, value) != value:
+            raise ValueError("The position doesn't match the moves")
+    return moves, final, cat_turn, status, cat_wins
+
+
+def get_user_ids(usernames):
+    """ Ids of the users, the ones that don't exist are created without
+    password """
+    ids = dict(User.objects.filter(username__in=usernames)
+               .values_list('username', 'id'))
+    missing = [name for name in usernames if name not in ids]
+    if missing:
+        User.objects.bulk_create(
+            User(username=name, password=make_password(None))
+            for name in missing)
+        ids.update(User.objects.filter(username__in=missing)
+                   .values_list('username', 'id'))
+    return ids
+
+
+def insert_games(games):
+    # The ids are given by the DB, so no id is used twice, by imports
+    # running at once or after games are deleted
+    if connection.features.can_return_ids_from_bulk_insert:
+        Game.objects.bulk_create(games, batch_size=BATCH_SIZE)
+        return
+    for game in games:
+        # Without Game.save: play() has checked the game, and a new game
+        # is not a new version
+        super(Game, game).save(force_insert=True)
+
+
+def insert_batch(records, packed):
+    usernames = set()
+    for _, record, _ in records:
+        usernames.add(record['cat_user'])
+        if record.get('mouse_user'):
+            usernames.add(record['mouse_user'])
+    user_ids = get_user_ids(sorted(usernames))
+
+    games = []
+    for _, record, result in records:
+        game_moves, final, cat_turn, status, cat_wins = result
+        game = Game(cat_user_id=user_ids[record['cat_user']],
+                    mouse_user_id=user_ids.get(record.get('mouse_user')),
+                    cat_turn=cat_turn, status=status,
+                    version=len(game_moves), **final)
+        if cat_wins is not None:
+            game.cat_wins = cat_wins
+        if packed and status == GameStatus.FINISHED:
+            game.packed_moves = movelog.pack(game_moves)
+            game.snapshots = movelog.snapshots(
+                game.get_cats_mask(), game.mouse, game_moves)
+        games.append(game)
+    insert_games(games)
+
+    moves = []
+    for game, (_, _, result) in zip(games, records):
+        if game.packed_moves is not None:
+            continue
+        for ply, (origin, target) in enumerate(result[0]):
+            player = game.mouse_user_id if ply % 2 else game.cat_user_id
+            moves.append(Move(game_id=game.id, player_id=player,
+                              origin=origin, target=target))
+    Move.objects.bulk_create(moves, batch_size=BATCH_SIZE)
+    for game in games:
+        if game.status == GameStatus.FINISHED:
+            UserStats.objects.record_game(game)
+    return len(games), len(moves)
+
+
+def import_games(lines, batch_size=BATCH_SIZE, packed=False):
+    """ Imports the games of the NDJSON lines. With packed, the moves of
+    the finished games are stored packed instead of as Move rows.
+    Returns the number of games and Move rows inserted and a list of
+    (line number, error) of the games skipped """
+    n_games = n_moves = 0
+    errors = []
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            batch.append((number, record, play(record)))
+        except (ValueError, TypeError, AttributeError, KeyError) as err:
+            errors.append((number, str(err)))
+            continue
+        if len(batch) >= batch_size:
+            inserted = insert_batch(batch, packed)
+            n_games, n_moves = n_games + inserted[0], n_moves + inserted[1]
+            batch = []
+    if batch:
+        inserted = insert_batch(batch, packed)
+        n_games, n_moves = n_games + inserted[0], n_moves + inserted[1]
+    return n_games, n_moves, errors
@@ -0,0 +1,77 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from datamodel import benchmark
+
+
+class Command(BaseCommand):
+    help = "Time the rules of the game and the models and compare them " \
+        "with the baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--positions", type=int,
+                            default=benchmark.POSITIONS,
+                            help="Random positions of each benchmark")
+        parser.add_argument("--games", type=int, default=benchmark.GAMES,
+                            help="Random packed games read")
+        parser.add_argument("--rounds", type=int, default=benchmark.ROUNDS,
+                            help="Rounds of each benchmark, the fastest "
+                            "one counts")
+        parser.add_argument("--seed", type=int, default=benchmark.SEED,
+                            help="Seed of the random positions")
+        parser.add_argument("--only", nargs="+", metavar="NAME",
+                            help="Run only these benchmarks")
+        parser.add_argument("--baseline", default=settings.BENCHMARK_BASELINE,
+                            help="JSON file of the baseline")
+        parser.add_argument("--threshold", type=float,
+                            default=settings.BENCHMARK_THRESHOLD,
+                            help="Fraction slower than the baseline that "
+                            "is a regression")
+        parser.add_argument("--save", action="store_true",
+                            help="Store the times as the new baseline")
+
+    def handle(self, *args, **options):
+        if min(options["positions"], options["games"],
+               options["rounds"]) < 1:
+            raise CommandError("--positions, --games and --rounds must be "
+                               "positive")
+        unknown = set(options["only"] or ()) - set(benchmark.NAMES)
+        if unknown:
+            raise CommandError("Unknown benchmarks: %s" %
+                               ", ".join(sorted(unknown)))
+        # Without a baseline there is nothing to compare with
+        exists = os.path.exists(options["baseline"])
+        if not exists and not options["save"]:
+            raise CommandError("There is no baseline in %s, store one with "
+                               "--save" % options["baseline"])
+        results = benchmark.run(options["positions"], options["games"],
+                                options["rounds"], options["seed"],
+                                options["only"])
+        baseline = {}
+        if exists:
+            baseline = benchmark.load_baseline(options["baseline"])
+
+        rows = benchmark.compare(results, baseline, options["threshold"])
+        self.stdout.write("%-24s %12s %12s %8s" %
+                          ("benchmark", "ns/call", "baseline", "change"))
+        for name, value, base, change, regression in rows:
+            self.stdout.write("%-24s %12.0f %12s %8s%s" % (
+                name, value, "-" if base is None else "%.0f" % base,
+                "-" if change is None else "%+.1f%%" % (change * 100),
+                "  REGRESSION" if regression else ""))
+
+        if options["save"]:
+            baseline.update(results)
+            benchmark.save_baseline(baseline, options["baseline"])
+            self.stdout.write("Baseline written to %s" % options["baseline"])
+            return
+        missing = [row[0] for row in rows if row[2] is None]
+        if missing:
+            raise CommandError("The baseline has no times of %s, store "
+                               "them with --save" % ", ".join(missing))
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            raise CommandError("Slower than the baseline: %s" %
+                               ", ".join(regressions))
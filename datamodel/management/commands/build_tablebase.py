@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from datamodel import tablebase
+
+
+class Command(BaseCommand):
+    help = "Solve every position of the game and write the tablebase"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.TABLEBASE_PATH,
+                            help="Path of the tablebase file")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        table = tablebase.solve()
+        tablebase.write(table, options["output"])
+        self.stdout.write("%d positions solved in %.1f s, written to %s" %
+                          (len(table), time.time() - start,
+                           options["output"]))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from datamodel import export
+
+
+class Command(BaseCommand):
+    help = "Export every game with its moves as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=export.FORMATS,
+                            default="ndjson", help="Format of the export")
+        parser.add_argument("--output", help="File of the export, the "
+                            "standard output if it is not given")
+        parser.add_argument("--chunk", type=int, default=export.CHUNK_SIZE,
+                            help="Games read with each query")
+
+    def handle(self, *args, **options):
+        lines = export.export_lines(options["format"], options["chunk"])
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", newline="") as output:
+            output.writelines(lines)
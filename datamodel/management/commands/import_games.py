@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from datamodel import importer
+
+
+class Command(BaseCommand):
+    help = "Import games in the NDJSON format of export_games, checking " \
+        "their moves"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="NDJSON file of the games")
+        parser.add_argument("--batch", type=int, default=importer.BATCH_SIZE,
+                            help="Games inserted with each bulk_create")
+        parser.add_argument("--packed", action="store_true",
+                            help="Store the moves of the finished games "
+                            "packed (see pack_moves)")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        with open(options["input"]) as lines, transaction.atomic():
+            games, moves, errors = importer.import_games(
+                lines, options["batch"], options["packed"])
+        for number, error in errors:
+            self.stderr.write("Line %d: %s" % (number, error))
+        self.stdout.write("%d games and %d moves imported in %.1f s, "
+                          "%d games skipped" %
+                          (games, moves, time.time() - start, len(errors)))
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from datamodel import movelog
+from datamodel.models import Game, GameStatus, Move
+
+
+class Command(BaseCommand):
+    help = "Pack the moves of the finished games into Game.packed_moves, " \
+        "and add the snapshots of the games packed without them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500,
+                            help="Games packed in each transaction")
+        parser.add_argument("--prune", action="store_true",
+                            help="Delete the Move rows of the packed games")
+
+    def handle(self, *args, **options):
+        packed = snapshotted = 0
+        last_id = 0
+        while True:
+            # A finished game doesn't get more moves. The games packed
+            # before the snapshots existed only need them
+            games = list(Game.objects.filter(
+                Q(packed_moves__isnull=True) | Q(snapshots__isnull=True),
+                status=GameStatus.FINISHED, id__gt=last_id).order_by('id')
+                .only('cat1', 'cat2', 'cat3', 'cat4', 'mouse',
+                      'packed_moves')[:options["batch"]])
+            if not games:
+                break
+            ids = [game.id for game in games
+                   if game.packed_moves is None]
+            moves = defaultdict(list)
+            for game_id, origin, target in Move.objects \
+                    .filter(game_id__in=ids).order_by('game_id', 'id') \
+                    .values_list('game_id', 'origin', 'target'):
+                moves[game_id].append((origin, target))
+            with transaction.atomic():
+                for game in games:
+                    if game.packed_moves is not None:
+                        snapshots = movelog.snapshots(
+                            game.get_cats_mask(), game.mouse,
+                            movelog.unpack(game.packed_moves))
+                        Game.objects.filter(id=game.id) \
+                            .update(snapshots=snapshots)
+                        snapshotted += 1
+                        continue
+                    try:
+                        data = movelog.pack(moves[game.id])
+                    except ValueError:
+                        self.stderr.write("Game %d has moves that can't be "
+                                          "packed" % game.id)
+                        continue
+                    snapshots = movelog.snapshots(
+                        game.get_cats_mask(), game.mouse, moves[game.id])
+                    Game.objects.filter(id=game.id) \
+                        .update(packed_moves=data, snapshots=snapshots)
+                    packed += 1
+            last_id = games[-1].id
+
+        pruned = 0
+        if options["prune"]:
+            pruned, _ = Move.objects.filter(
+                game__status=GameStatus.FINISHED,
+                game__packed_moves__isnull=False).delete()
+        self.stdout.write("%d games packed, %d moves deleted, %d games "
+                          "with new snapshots" % (packed, pruned, snapshotted))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from datamodel.models import UserStats
+
+
+class Command(BaseCommand):
+    help = "Compute again the stats and the ratings of every user from " \
+        "the finished games"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk", type=int, default=2000,
+                            help="Games read from the DB at a time")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = UserStats.objects.rebuild(options["chunk"])
+        self.stdout.write("%d users with stats" % users)
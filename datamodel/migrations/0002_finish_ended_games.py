@@ -0,0 +1,31 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:00
+
+from django.db import migrations
+
+from datamodel import bitboard
+
+ACTIVE = 1
+FINISHED = 2
+
+
+def finish_ended_games(apps, schema_editor):
+    # The end of a game used to be saved when the board was shown, so an
+    # active game could be already over
+    Game = apps.get_model('datamodel', 'Game')
+    for game in Game.objects.filter(status=ACTIVE).iterator():
+        cats = bitboard.cats_mask(game.cat1, game.cat2, game.cat3, game.cat4)
+        cat_wins = bitboard.winner(cats, game.mouse)
+        if cat_wins is not None:
+            Game.objects.filter(id=game.id).update(status=FINISHED,
+                                                   cat_wins=cat_wins)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(finish_ended_games, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0002_finish_ended_games'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['cat_user', 'status', '-id'], name='game_cat_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['mouse_user', 'status', '-id'], name='game_mouse_list_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0003_game_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', '-id'], name='game_open_idx'),
+        ),
+    ]
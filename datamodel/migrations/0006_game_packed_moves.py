@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0005_game_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='packed_moves',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0006_game_packed_moves'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='snapshots',
+            field=models.BinaryField(null=True),
+        ),
+    ]
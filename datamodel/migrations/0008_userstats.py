@@ -0,0 +1,61 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FINISHED = 2
+
+
+def fill_stats(apps, schema_editor):
+    # Stats of the games finished before the table existed, in the order
+    # they were played for the streaks
+    Game = apps.get_model('datamodel', 'Game')
+    UserStats = apps.get_model('datamodel', 'UserStats')
+    stats = {}
+    for cat, mouse, cat_wins in Game.objects.filter(status=FINISHED) \
+            .order_by('id') \
+            .values_list('cat_user_id', 'mouse_user_id', 'cat_wins') \
+            .iterator():
+        if mouse is None:
+            continue
+        for user_id in (cat, mouse):
+            if user_id not in stats:
+                stats[user_id] = UserStats(user_id=user_id)
+            stats[user_id].played += 1
+        winner, loser = (cat, mouse) if cat_wins else (mouse, cat)
+        stats[winner].wins += 1
+        stats[winner].streak += 1
+        if cat_wins:
+            stats[winner].wins_as_cat += 1
+        else:
+            stats[winner].wins_as_mouse += 1
+        stats[loser].streak = 0
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('datamodel', '0007_game_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('played', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('wins_as_cat', models.PositiveIntegerField(default=0)),
+                ('wins_as_mouse', models.PositiveIntegerField(default=0)),
+                ('streak', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='userstats',
+            index=models.Index(fields=['-wins', 'user'], name='userstats_wins_idx'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
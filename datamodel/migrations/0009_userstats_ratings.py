@@ -0,0 +1,39 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+from datamodel import elo
+
+FINISHED = 2
+
+
+def compute_ratings(apps, schema_editor):
+    Game = apps.get_model('datamodel', 'Game')
+    UserStats = apps.get_model('datamodel', 'UserStats')
+    ratings = elo.replay(
+        Game.objects.filter(status=FINISHED).order_by('id')
+        .values_list('cat_user_id', 'mouse_user_id', 'cat_wins').iterator())
+    for user_id, (cat_rating, mouse_rating) in ratings.items():
+        UserStats.objects.filter(user_id=user_id).update(
+            cat_rating=cat_rating, mouse_rating=mouse_rating)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datamodel', '0008_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='cat_rating',
+            field=models.FloatField(default=1500.0),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='mouse_rating',
+            field=models.FloatField(default=1500.0),
+        ),
+        migrations.RunPython(compute_ratings, migrations.RunPython.noop),
+    ]
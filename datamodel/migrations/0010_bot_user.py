@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, \
+    make_password
+from django.db import migrations
+
+BOT_USERNAME = "mouse_cat_bot"
+
+
+def create_bot(apps, schema_editor):
+    # The bot is an inactive user without password, nobody can log in as
+    # it. An account of a person with its name is not taken over, it has
+    # to be renamed by hand first
+    app_label, model_name = settings.AUTH_USER_MODEL.split('.')
+    User = apps.get_model(app_label, model_name)
+    user = User.objects.filter(username=BOT_USERNAME).first()
+    if user is None:
+        User.objects.create(username=BOT_USERNAME,
+                            password=make_password(None), is_active=False)
+    elif user.is_active or \
+            not user.password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        raise RuntimeError(
+            "The user %d has the name of the bot (%s). Rename it and run "
+            "the migration again" % (user.id, BOT_USERNAME))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('datamodel', '0009_userstats_ratings'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_bot, migrations.RunPython.noop),
+    ]
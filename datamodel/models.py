@@ -1,8 +1,16 @@
-from django.core.exceptions import ValidationError, ObjectDoesNotExist
-from django.db import models
+import atexit
+import random
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
 from django.core.validators import MaxValueValidator, MinValueValidator
-from datamodel import constants
+from datamodel import bitboard, constants, elo, movelog
+from datamodel.hub import hub
 
 
 class GameStatus(models.Model):
@@ -11,6 +19,76 @@ class GameStatus(models.Model):
     FINISHED = 2
 
 
+class GameManager(models.Manager):
+    JOIN_ATTEMPTS = 5
+    JOIN_CANDIDATES = 20
+    STATE_FIELDS = ('id', 'cat1', 'cat2', 'cat3', 'cat4', 'mouse',
+                    'cat_turn', 'status', 'cat_wins', 'version')
+
+    def get_state(self, game_id):
+        # State of a game (see Game.get_state) with one query of its row,
+        # None if it doesn't exist
+        values = self.filter(id=game_id).values(*self.STATE_FIELDS).first()
+        if values is None:
+            return None
+        return Game.build_state(values)
+
+    def open_games(self, user):
+        # Games waiting for a mouse, newest first
+        return self.filter(status=GameStatus.CREATED,
+                           mouse_user__isnull=True) \
+            .exclude(cat_user=user).order_by('-id')
+
+    def join(self, user):
+        """ Makes user the mouse of an open game of another cat: among the
+        JOIN_CANDIDATES newest ones, the one of the cat with the closest
+        rating, and the newest of those. Returns the id of the game or None
+        if there is no game to join. Two users never get the same game """
+        stats = UserStats.objects.filter(user_id=user.id) \
+            .values_list('mouse_rating', flat=True).first()
+        rating = elo.INITIAL if stats is None else stats
+        if connection.vendor == 'postgresql':
+            # One UPDATE that locks the game it takes, skipping the ones
+            # other requests are taking
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            stats_table = connection.ops.quote_name(
+                UserStats._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE " + table + " SET mouse_user_id = %s,"
+                    " status = %s, version = version + 1"
+                    " WHERE id = (SELECT g.id FROM " + table + " g"
+                    " LEFT JOIN " + stats_table + " s"
+                    " ON s.user_id = g.cat_user_id"
+                    " WHERE g.status = %s AND g.mouse_user_id IS NULL"
+                    " AND g.id IN (SELECT id FROM " + table +
+                    " WHERE status = %s AND mouse_user_id IS NULL"
+                    " AND cat_user_id <> %s ORDER BY id DESC LIMIT %s)"
+                    " ORDER BY ABS(COALESCE(s.cat_rating, %s) - %s),"
+                    " g.id DESC LIMIT 1 FOR UPDATE OF g SKIP LOCKED)"
+                    " RETURNING id",
+                    [user.id, GameStatus.ACTIVE, GameStatus.CREATED,
+                     GameStatus.CREATED, user.id, self.JOIN_CANDIDATES,
+                     elo.INITIAL, rating])
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        # Without SKIP LOCKED the UPDATE only takes the game if it is
+        # still open, and the next one is tried if it was taken meanwhile
+        candidates = self.open_games(user).values_list(
+            'id', 'cat_user__stats__cat_rating')[:self.JOIN_CANDIDATES]
+        candidates = sorted(
+            candidates, key=lambda game: (abs(
+                (elo.INITIAL if game[1] is None else game[1]) - rating),
+                -game[0]))
+        for game_id, _ in candidates[:self.JOIN_ATTEMPTS]:
+            if self.filter(id=game_id, mouse_user__isnull=True).update(
+                    mouse_user=user, status=GameStatus.ACTIVE,
+                    version=F('version') + 1):
+                return game_id
+        return None
+
+
 class Game(models.Model):
     # cat and mouse are foreign keys of a user
     cat_user = models.ForeignKey(User, related_name="games_as_cat",
@@ -35,15 +113,30 @@ class Game(models.Model):
     # if True it is cat turn. if False it is mouse turn. Default the cat starts
     cat_turn = models.BooleanField(null=False, default=True)
     status = models.IntegerField(null=False, default=GameStatus.CREATED)
+    # Increased by every move and change of status, the clients know when
+    # the game changed
+    version = models.PositiveIntegerField(null=False, default=0)
+    # Moves of a finished game, packed by "manage.py pack_moves" (see
+    # datamodel.movelog). None while they are Move rows
+    packed_moves = models.BinaryField(null=True)
+    # Positions every movelog.SNAPSHOT_INTERVAL moves of a packed game
+    snapshots = models.BinaryField(null=True)
+
+    objects = GameManager()
+
+    class Meta:
+        # The list of games of a user, by status and newest first, and
+        # the queue of open games
+        indexes = [
+            models.Index(fields=['cat_user', 'status', '-id'],
+                         name='game_cat_list_idx'),
+            models.Index(fields=['mouse_user', 'status', '-id'],
+                         name='game_mouse_list_idx'),
+            models.Index(fields=['status', '-id'], name='game_open_idx'),
+        ]
 
     def cell_is_valid(self, cell):
-        if cell < self.MIN_CELL or cell > self.MAX_CELL:
-            return False
-        row = int(cell) / 8
-        col = int(cell) % 8
-        if int(row) % 2 != col % 2:
-            return False
-        return True
+        return bitboard.cell_is_valid(int(cell))
 
     def validate(self):
         # Status validation
@@ -61,7 +154,14 @@ class Game(models.Model):
 
     def save(self, *args, **kwargs):
         if self.validate() is True:
+            # Any change of a saved game is a new version
+            changed = self.pk is not None
+            if changed:
+                self.version += 1
             super(Game, self).save(*args, **kwargs)
+            if changed:
+                state = self.get_state()
+                transaction.on_commit(lambda: hub.publish(state))
 
     def get_array_positions(self):
         return [self.cat1, self.cat2, self.cat3, self.cat4, self.mouse]
@@ -69,6 +169,63 @@ class Game(models.Model):
     def get_cat_positions(self):
         return [self.cat1, self.cat2, self.cat3, self.cat4]
 
+    def get_cats_mask(self):
+        # Bitboard with the cells of the cats (see datamodel.bitboard)
+        return bitboard.cats_mask(int(self.cat1), int(self.cat2),
+                                  int(self.cat3), int(self.cat4))
+
+    @staticmethod
+    def build_state(values):
+        cats = bitboard.cats_mask(values['cat1'], values['cat2'],
+                                  values['cat3'], values['cat4'])
+        winner = None
+        if values['status'] == GameStatus.FINISHED:
+            winner = 'cat' if values['cat_wins'] else 'mouse'
+        return {'id': values['id'], 'version': values['version'],
+                'cats': cats, 'cat_cells': bitboard.cells(cats),
+                'mouse': values['mouse'], 'cat_turn': values['cat_turn'],
+                'status': values['status'], 'winner': winner}
+
+    def get_state(self):
+        """ Position, turn and result of the game, as sent to the
+        clients. cats is the bitboard of the cats and cat_cells the same
+        cells as a list """
+        return Game.build_state({field: getattr(self, field)
+                                 for field in GameManager.STATE_FIELDS})
+
+    def get_moves(self):
+        """ (origin, target) of every move of the game, in order """
+        if self.packed_moves is not None:
+            return movelog.unpack(self.packed_moves)
+        return list(self.moves.order_by('id')
+                    .values_list('origin', 'target'))
+
+    def get_snapshots(self):
+        """ Packed snapshots of the game (see datamodel.movelog) """
+        return movelog.snapshots(self.get_cats_mask(), int(self.mouse),
+                                 self.get_moves())
+
+    def get_position(self, ply):
+        """ (cats, mouse, cat_turn) after `ply` moves, None if the game
+        has less moves. A packed game only reads its nearest snapshot and
+        the moves after it """
+        if self.packed_moves is not None:
+            packed = self.packed_moves
+            packed_snapshots = self.snapshots
+            if packed_snapshots is None:
+                packed_snapshots = self.get_snapshots()
+        else:
+            moves = self.get_moves()
+            packed = movelog.pack(moves)
+            packed_snapshots = movelog.snapshots(
+                self.get_cats_mask(), int(self.mouse), moves)
+        if not 0 <= ply <= len(packed):
+            return None
+        cats, mouse = movelog.position_at(packed, packed_snapshots, ply)
+        # The turn changes with every move
+        cat_turn = self.cat_turn != bool((len(packed) - ply) % 2)
+        return cats, mouse, cat_turn
+
     def get_game_initial_cells(self):
         game_cells = []
         for i in range(0, 64):
@@ -78,45 +235,68 @@ class Game(models.Model):
         return game_cells
 
     def get_game_cells(self):
-        game_cells = []
-        for i in range(0, 64):
-            if i == self.mouse:
-                game_cells.append(-1)
-            elif i in self.get_cat_positions():
-                game_cells.append(1)
-            else:
-                game_cells.append(0)
+        cats = self.get_cats_mask()
+        mouse = int(self.mouse)
+        game_cells = [cats >> i & 1 for i in range(0, 64)]
+        game_cells[mouse] = -1
         return game_cells
 
     def mouse_alternatives(self):
-        alternatives = []
-        m = self.mouse
         # alternatives in the four directions, if they are valid
-        if self.cell_is_valid(m-9):
-            alternatives.append(m-9)
-        if self.cell_is_valid(m-7):
-            alternatives.append(m-7)
-        if self.cell_is_valid(m+7):
-            alternatives.append(m+7)
-        if self.cell_is_valid(m+9):
-            alternatives.append(m+9)
-        return alternatives
+        return list(bitboard.MOUSE_TARGETS[int(self.mouse)])
 
     def mouse_is_trapped(self):
-        for aux in self.mouse_alternatives():
-            if aux not in self.get_cat_positions():
-                return False
+        if not bitboard.mouse_is_trapped(self.get_cats_mask(),
+                                         int(self.mouse)):
+            return False
         self.status = GameStatus.FINISHED
         self.cat_wins = True
         return True
 
     def mouse_at_top(self):
-        if int(self.mouse/8) <= int(min(self.get_cat_positions())/8):
+        if bitboard.mouse_at_top(self.get_cats_mask(), int(self.mouse)):
             self.status = GameStatus.FINISHED
             self.cat_wins = False
             return True
         return False
 
+    def get_changes(self, origin, target):
+        # Fields that change with a legal move of the side to move,
+        # including the end of the game if the move finishes it
+        cats, mouse = self.get_cats_mask(), int(self.mouse)
+        if not self.cat_turn:
+            changes = {'mouse': target, 'cat_turn': True}
+            mouse = target
+        else:
+            for field in ('cat1', 'cat2', 'cat3', 'cat4'):
+                if int(getattr(self, field)) == origin:
+                    break
+            else:
+                raise ValidationError(constants.MSG_ERROR_MOVE)
+            changes = {field: target, 'cat_turn': False}
+            cats ^= (1 << origin) | (1 << target)
+        cat_wins = bitboard.winner(cats, mouse)
+        if cat_wins is not None:
+            changes['status'] = GameStatus.FINISHED
+            changes['cat_wins'] = cat_wins
+        return changes
+
+    def apply_move(self, origin, target):
+        """ Writes a validated move with a single UPDATE that only
+        matches if the game is still as it was read (compare and swap).
+        Returns False if another request changed the game first """
+        changes = self.get_changes(origin, target)
+        updated = Game.objects.filter(
+            pk=self.pk, status=GameStatus.ACTIVE, cat_turn=self.cat_turn,
+            cat1=self.cat1, cat2=self.cat2, cat3=self.cat3, cat4=self.cat4,
+            mouse=self.mouse).update(version=F('version') + 1, **changes)
+        if not updated:
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.version += 1
+        return True
+
     def get_status_str(self):
         if self.status == GameStatus.ACTIVE:
             return "Active"
@@ -161,95 +341,131 @@ class Move(models.Model):
     date = models.DateField(auto_now=True)
 
     def cat_moving_well(self):
-        origin = int(self.origin)
-        target = int(self.target)
-
-        # The target is empty validation
-        if target in self.game.get_array_positions():
-            raise ValidationError(constants.MSG_ERROR_MOVE)
-
-        # The target is a valid position validation
-        if not self.game.cell_is_valid(target):
-            raise ValidationError(constants.MSG_ERROR_MOVE)
-
-        # If its a cat, the target is origin + 7 or origin + 9
-        if origin + 7 != target and origin + 9 != target:
+        # The target is empty, valid and it is origin + 7 or origin + 9
+        if not bitboard.cat_step_is_valid(self.game.get_cats_mask(),
+                                          int(self.game.mouse),
+                                          int(self.origin),
+                                          int(self.target)):
             raise ValidationError(constants.MSG_ERROR_MOVE)
 
         return True
 
     def mouse_moving_well(self):
-        # The target is empty validation
-        if self.target in self.game.get_array_positions():
-            raise ValidationError(constants.MSG_ERROR_MOVE)
-
-        # The target is a valid position validation
-        if self.target not in self.game.mouse_alternatives():
+        # The target is empty and next to the mouse
+        game = self.game
+        if not bitboard.mouse_can_move(game.get_cats_mask(), int(game.mouse),
+                                       int(game.mouse), int(self.target)):
             raise ValidationError(constants.MSG_ERROR_MOVE)
 
         return True
 
     def validate(self):
+        game = self.game
         # We check if the game is active
-        if self.game.status != GameStatus.ACTIVE:
+        if game.status != GameStatus.ACTIVE:
             raise ValidationError(constants.MSG_ERROR_MOVE)
 
-        origin = int(self.origin)
-
-        # If is cat_turn, then the player must be the cat
-        if self.player == self.game.cat_user and self.game.cat_turn:
-
-            if self.cat_moving_well():
-                if origin is self.game.cat1:
-                    self.game.cat1 = self.target
-                elif origin is self.game.cat2:
-                    self.game.cat2 = self.target
-                elif origin is self.game.cat3:
-                    self.game.cat3 = self.target
-                elif origin is self.game.cat4:
-                    self.game.cat4 = self.target
-                else:
-                    # Moving from an empty cell
-                    raise ValidationError(constants.MSG_ERROR_MOVE)
-
-                self.game.cat_turn = False
-                self.game.save()
-                return True
-
-        # If is mouse turn
-        elif self.player == self.game.mouse_user and not self.game.cat_turn \
-                and self.mouse_moving_well() and origin is self.game.mouse:
-            self.game.mouse = self.target
-            self.game.cat_turn = True
-            self.game.save()
-            return True
-
-        raise ValidationError(constants.MSG_ERROR_MOVE)
+        # The player must be the one of the turn. Comparing the ids
+        # doesn't load the users
+        if game.cat_turn:
+            if self.player_id != game.cat_user_id:
+                raise ValidationError(constants.MSG_ERROR_MOVE)
+            self.cat_moving_well()
+            # Moving from an empty cell
+            if not game.get_cats_mask() >> int(self.origin) & 1:
+                raise ValidationError(constants.MSG_ERROR_MOVE)
+        else:
+            if self.player_id != game.mouse_user_id:
+                raise ValidationError(constants.MSG_ERROR_MOVE)
+            if int(self.origin) != int(game.mouse):
+                raise ValidationError(constants.MSG_ERROR_MOVE)
+            self.mouse_moving_well()
+        return True
 
     def save(self, *args, **kwargs):
         if self.validate() is True:
-            super(Move, self).save(*args, **kwargs)
+            # The game UPDATE and the move INSERT, and the stats of the
+            # players if the game ends, are committed together or none
+            with transaction.atomic(savepoint=False):
+                applied = self.game.apply_move(int(self.origin),
+                                               int(self.target))
+                if applied:
+                    super(Move, self).save(*args, **kwargs)
+                    if self.game.status == GameStatus.FINISHED:
+                        UserStats.objects.record_game(self.game)
+                    state = self.game.get_state()
+                    state['move'] = [int(self.origin), int(self.target)]
+                    # The players and spectators waiting for this game
+                    # get the new state without reading the DB
+                    transaction.on_commit(lambda: hub.publish(state))
+            if not applied:
+                raise ValidationError(constants.MSG_ERROR_MOVE_CONFLICT,
+                                      code='conflict')
 
     def create(self, game, player, origin, target):
         self.validate()
 
 
+def update_can_return():
+    # UPDATE ... RETURNING is supported by PostgreSQL and SQLite >= 3.35
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return False
+
+
 # This class work for Counter.objects. Making it a singleton class
 class SingletonCounter(models.Manager):
+    """ The counter is the row with pk=1. With settings.COUNTER_SHARDS > 1
+    the rows 1..COUNTER_SHARDS are increased at random and the value is
+    their sum, so concurrent requests don't wait for the same row """
+
+    def add(self, pk, delta):
+        """ Atomically adds delta to a row and returns its new value, or
+        None if the row doesn't exist """
+        if update_can_return():
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute("UPDATE " + table + " SET value = value + %s"
+                               " WHERE id = %s RETURNING value", [delta, pk])
+                row = cursor.fetchone()
+            return row[0] if row else None
+        with transaction.atomic():
+            if not self.filter(pk=pk).update(value=F('value') + delta):
+                return None
+            return self.filter(pk=pk).values_list('value', flat=True)[0]
+
+    def add_or_create(self, pk, delta):
+        value = self.add(pk, delta)
+        if value is not None:
+            return value
+        try:
+            with transaction.atomic():
+                Counter(pk=pk, value=delta).save(priv=True, force_insert=True)
+            return delta
+        except IntegrityError:
+            # Another request created the row meanwhile
+            return self.add(pk, delta)
+
+    def increase(self, delta):
+        """ Adds delta to the counter and returns its new value """
+        shards = settings.COUNTER_SHARDS
+        if shards <= 1:
+            return self.add_or_create(1, delta)
+        self.add_or_create(random.randint(1, shards), delta)
+        return self.get_current_value()
 
     def inc(self):
-        try:
-            counter = Counter.objects.get(pk=1)
-            counter.value += 1
-            Counter.objects.all().filter(pk=1).update(value=counter.value)
-            return counter.value
-        except ObjectDoesNotExist:
-            # Initial value is 1 because we are increasing the counter
-            counter = Counter(value=1, pk=1)
-            counter.save(priv=True)
-            return counter.value
+        if settings.COUNTER_BUFFER:
+            return counter_buffer.inc()
+        return self.increase(1)
 
     def get_current_value(self):
+        shards = settings.COUNTER_SHARDS
+        if shards > 1:
+            total = self.filter(pk__lte=shards).aggregate(total=Sum('value'))
+            return total['total'] or 0
         counter = Counter.objects.all().filter(pk=1)
         if counter:
             return counter[0].value
@@ -260,6 +476,68 @@ class SingletonCounter(models.Manager):
             return counter.value
 
 
+class CounterBuffer:
+    """ Hits of this process that are not in the DB yet. They are written
+    together after COUNTER_FLUSH_HITS hits or COUNTER_FLUSH_INTERVAL
+    seconds, so a crash loses at most that many hits """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.flushed = None
+        self.timer = None
+
+    def inc(self):
+        if self.flushed is None:
+            self.flushed = Counter.objects.get_current_value()
+        with self.lock:
+            self.pending += 1
+            value = self.flushed + self.pending
+            full = self.pending >= settings.COUNTER_FLUSH_HITS
+            if not full and self.timer is None:
+                self.timer = threading.Timer(settings.COUNTER_FLUSH_INTERVAL,
+                                             self.flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            return self.flush()
+        return value
+
+    def flush(self):
+        with self.lock:
+            delta, self.pending = self.pending, 0
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not delta:
+            return self.flushed
+        try:
+            total = Counter.objects.increase(delta)
+        except Exception:
+            # The hits stay pending for the next flush
+            with self.lock:
+                self.pending += delta
+            raise
+        with self.lock:
+            # Another flush may have finished first, and the hits counted
+            # while writing are still pending
+            self.flushed = max(self.flushed or 0, total)
+            return self.flushed + self.pending
+
+    def flush_from_timer(self):
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own connection
+            connection.close()
+
+
+counter_buffer = CounterBuffer()
+atexit.register(counter_buffer.flush)
+
+
 class Counter(models.Model):
     value = models.IntegerField(null=False, default=0)
 
@@ -274,3 +552,121 @@ class Counter(models.Model):
     def __str__(self):
         return "The counter id is:: " + str(self.id) + \
                "\nAnd the value is: " + str(self.value)
+
+
+class UserStatsManager(models.Manager):
+    def record_game(self, game):
+        """ Adds a finished game to the stats and the ratings (see
+        datamodel.elo) of its two players """
+        ratings = {
+            user_id: (cat_rating, mouse_rating)
+            for user_id, cat_rating, mouse_rating in self.select_for_update()
+            .filter(user_id__in=[game.cat_user_id, game.mouse_user_id])
+            .values_list('user_id', 'cat_rating', 'mouse_rating')}
+        cat_rating, mouse_rating = elo.update(
+            self.get_rating(ratings, game.cat_user_id, 0),
+            self.get_rating(ratings, game.mouse_user_id, 1), game.cat_wins)
+        self.add(game.cat_user_id, 'wins_as_cat' if game.cat_wins else None,
+                 cat_rating=cat_rating)
+        self.add(game.mouse_user_id,
+                 None if game.cat_wins else 'wins_as_mouse',
+                 mouse_rating=mouse_rating)
+
+    @staticmethod
+    def get_rating(ratings, user_id, role):
+        # role is 0 for the cat rating and 1 for the mouse rating
+        if user_id not in ratings:
+            return elo.INITIAL
+        return ratings[user_id][role]
+
+    def add(self, user_id, role, **ratings):
+        # One UPDATE, and an INSERT after the first game of the user.
+        # role is the field of the win, None if the user lost
+        changes = {'played': F('played') + 1}
+        changes.update(ratings)
+        if role is None:
+            changes['streak'] = 0
+        else:
+            changes.update({'wins': F('wins') + 1, role: F(role) + 1,
+                            'streak': F('streak') + 1})
+        if self.filter(user_id=user_id).update(**changes):
+            return
+        stats = UserStats(user_id=user_id, played=1, **ratings)
+        if role is not None:
+            stats.wins = stats.streak = 1
+            setattr(stats, role, 1)
+        try:
+            with transaction.atomic():
+                stats.save(force_insert=True)
+        except IntegrityError:
+            # Another request created the row meanwhile
+            self.filter(user_id=user_id).update(**changes)
+
+    def rebuild(self, chunk_size=2000):
+        """ Computes again the stats and the ratings of every user from
+        the finished games, in the order they were played, to repair
+        them (record_game keeps them up to date). Returns the number of
+        users with stats. The caller runs it in a transaction """
+        games = Game.objects.filter(status=GameStatus.FINISHED) \
+            .exclude(mouse_user=None).order_by('id') \
+            .values_list('cat_user_id', 'mouse_user_id', 'cat_wins') \
+            .iterator(chunk_size=chunk_size)
+        stats = {}
+
+        def count(games):
+            # The wins of each game, while elo.replay rates it
+            for cat, mouse, cat_wins in games:
+                for user_id in (cat, mouse):
+                    if user_id not in stats:
+                        stats[user_id] = UserStats(user_id=user_id)
+                    stats[user_id].played += 1
+                winner, loser = (cat, mouse) if cat_wins else (mouse, cat)
+                stats[winner].wins += 1
+                stats[winner].streak += 1
+                if cat_wins:
+                    stats[winner].wins_as_cat += 1
+                else:
+                    stats[winner].wins_as_mouse += 1
+                stats[loser].streak = 0
+                yield cat, mouse, cat_wins
+
+        ratings = elo.replay(count(games))
+        for user_id, (cat_rating, mouse_rating) in ratings.items():
+            stats[user_id].cat_rating = cat_rating
+            stats[user_id].mouse_rating = mouse_rating
+        self.all().delete()
+        self.bulk_create(stats.values(), batch_size=1000)
+        return len(stats)
+
+    def leaderboard(self, size):
+        # The users with more wins, read from the index of wins. The bot
+        # is inactive and not in it
+        return self.select_related('user').filter(user__is_active=True) \
+            .order_by('-wins', 'user_id')[:size]
+
+
+class UserStats(models.Model):
+    # Kept up to date by the move that finishes each game
+    user = models.OneToOneField(User, primary_key=True,
+                                related_name="stats",
+                                on_delete=models.CASCADE)
+    played = models.PositiveIntegerField(null=False, default=0)
+    wins = models.PositiveIntegerField(null=False, default=0)
+    wins_as_cat = models.PositiveIntegerField(null=False, default=0)
+    wins_as_mouse = models.PositiveIntegerField(null=False, default=0)
+    # Games won in a row until the last one
+    streak = models.PositiveIntegerField(null=False, default=0)
+    # Elo ratings as cat and as mouse
+    cat_rating = models.FloatField(null=False, default=elo.INITIAL)
+    mouse_rating = models.FloatField(null=False, default=elo.INITIAL)
+
+    objects = UserStatsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-wins', 'user'], name='userstats_wins_idx'),
+        ]
+
+    def __str__(self):
+        return "%s: %d wins in %d games" % (self.user, self.wins,
+                                            self.played)
@@ -0,0 +1,65 @@
+"""
+    Packed move log of a finished game, one byte per move.
+
+    The 6 low bits of a byte are the origin cell and the 2 high bits the
+    diagonal of the step (see STEPS). Who moves is not stored: the cats
+    make the first move and the turns alternate.
+
+    The snapshots are the positions after 0, SNAPSHOT_INTERVAL,
+    2 * SNAPSHOT_INTERVAL... moves, so any position is found applying
+    less than SNAPSHOT_INTERVAL moves to one of them.
+"""
+import struct
+
+STEPS = (-9, -7, 7, 9)
+SNAPSHOT_INTERVAL = 16
+# Bitboard of the cats and cell of the mouse
+SNAPSHOT = struct.Struct(">QB")
+
+
+def pack(moves):
+    """ Bytes of a list of (origin, target). ValueError if a move is not
+    a diagonal step """
+    data = bytearray()
+    for origin, target in moves:
+        if not 0 <= origin <= 63:
+            raise ValueError("Invalid origin %d" % origin)
+        data.append(origin | STEPS.index(target - origin) << 6)
+    return bytes(data)
+
+
+def unpack(data):
+    """ List of (origin, target) of the packed moves """
+    return [(byte & 63, (byte & 63) + STEPS[byte >> 6])
+            for byte in bytes(data)]
+
+
+def play(cats, mouse, origin, target):
+    # Position after the piece in origin goes to target
+    if origin == mouse:
+        return cats, target
+    return cats ^ (1 << origin | 1 << target), mouse
+
+
+def snapshots(cats, mouse, moves, interval=SNAPSHOT_INTERVAL):
+    """ Packed snapshots of a game. cats and mouse are the position after
+    its last move, the older ones are found undoing the moves """
+    positions = []
+    for ply in range(len(moves), -1, -1):
+        if ply % interval == 0:
+            positions.append(SNAPSHOT.pack(cats, mouse))
+        if ply:
+            origin, target = moves[ply - 1]
+            cats, mouse = play(cats, mouse, target, origin)
+    positions.reverse()
+    return b"".join(positions)
+
+
+def position_at(packed, packed_snapshots, ply, interval=SNAPSHOT_INTERVAL):
+    """ (cats, mouse) after `ply` moves, from the nearest snapshot """
+    index = ply // interval
+    cats, mouse = SNAPSHOT.unpack_from(packed_snapshots,
+                                       index * SNAPSHOT.size)
+    for origin, target in unpack(packed[index * interval:ply]):
+        cats, mouse = play(cats, mouse, origin, target)
+    return cats, mouse
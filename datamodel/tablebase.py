@@ -0,0 +1,224 @@
+"""
+    Solved positions of the game (retrograde analysis).
+
+    Every placement of the 4 cats and the mouse on the 32 dark cells,
+    with both turns, has one byte in the table:
+    - 0: not a valid position (the mouse is on a cat)
+    - bit 7 set if the cats win, clear if the mouse wins
+    - bits 0-6: plies until the end of the game, plus one
+
+    Both sides play perfectly: the winner ends the game as soon as
+    possible and the loser delays it as much as possible. A side that
+    can't move loses.
+
+    The table is built once by the build_tablebase command and read with
+    mmap, so every process on the machine shares the same pages.
+"""
+import mmap
+import os
+
+from django.conf import settings
+
+from datamodel import bitboard
+
+MAGIC = b"RGTB\x01\x00\x00\x00"
+N_DARK = 32
+CATS_WIN = 0x80
+DISTANCE = 0x7f
+
+
+def _binomials():
+    table = [[0] * 5 for _ in range(N_DARK + 1)]
+    for n in range(N_DARK + 1):
+        table[n][0] = 1
+        for k in range(1, 5):
+            table[n][k] = table[n - 1][k - 1] + table[n - 1][k] if n else 0
+    return table
+
+
+BINOMIAL = _binomials()
+N_CATS = BINOMIAL[N_DARK][4]
+SIZE = N_CATS * N_DARK * 2
+
+
+def dark_index(cell):
+    # Dark cells are numbered 0-31, 4 in each row
+    return cell >> 1
+
+
+def dark_cell(index):
+    row = index >> 2
+    return row * 8 + 2 * (index & 3) + (row & 1)
+
+
+def cats_rank(cats):
+    """ Position of a cat mask in the colexicographic order of the
+    4-combinations of the dark cells """
+    rank = 0
+    for k, cell in enumerate(bitboard.cells(cats), 1):
+        rank += BINOMIAL[dark_index(cell)][k]
+    return rank
+
+
+def position_index(cats, mouse, cat_turn):
+    return ((cats_rank(cats) * N_DARK + dark_index(mouse)) << 1) \
+        | (1 if cat_turn else 0)
+
+
+def encode(cat_wins, distance):
+    return (distance + 1) | (CATS_WIN if cat_wins else 0)
+
+
+def decode(value):
+    """ (cat_wins, distance) or None for an invalid position """
+    if not value:
+        return None
+    return bool(value & CATS_WIN), (value & DISTANCE) - 1
+
+
+def _cat_configurations():
+    masks = []
+    for a in range(N_DARK):
+        for b in range(a + 1, N_DARK):
+            for c in range(b + 1, N_DARK):
+                for d in range(c + 1, N_DARK):
+                    masks.append(bitboard.cats_mask(
+                        dark_cell(a), dark_cell(b),
+                        dark_cell(c), dark_cell(d)))
+    return masks
+
+
+def _progress(cats):
+    return sum(cell >> 3 for cell in bitboard.cells(cats))
+
+
+def _best(values, side_is_cat):
+    # Value of a position given the values of its children
+    best = None
+    for value in values:
+        cat_wins, distance = decode(value)
+        if cat_wins == side_is_cat:
+            if best is None or not best[0] or distance < best[1]:
+                best = (True, distance)
+        elif best is None or (not best[0] and distance > best[1]):
+            best = (False, distance)
+    if best is None:
+        # No moves left, the side to move loses
+        return encode(not side_is_cat, 0)
+    wins, distance = best
+    return encode(side_is_cat == wins, distance + 1)
+
+
+def solve():
+    """ Solve every position. Returns the table as a bytearray """
+    table = bytearray(SIZE)
+    masks = _cat_configurations()
+    ranks = {cats: cats_rank(cats) for cats in masks}
+    mice = [dark_cell(index) for index in range(N_DARK)]
+
+    # A cat move always goes one row down, so the positions are solved
+    # from the most advanced cats to the initial ones and every child is
+    # known before its parent
+    for cats in sorted(masks, key=_progress, reverse=True):
+        base = ranks[cats] * N_DARK * 2
+        for turn in (True, False):
+            for mouse_index, mouse in enumerate(mice):
+                if cats >> mouse & 1:
+                    continue
+                index = base + (mouse_index << 1) + (1 if turn else 0)
+                result = bitboard.winner(cats, mouse)
+                if result is not None:
+                    table[index] = encode(result, 0)
+                    continue
+                values = []
+                for origin, target in bitboard.legal_moves(cats, mouse,
+                                                           turn):
+                    if turn:
+                        child = cats ^ (1 << origin) ^ (1 << target)
+                        values.append(table[(ranks[child] * N_DARK +
+                                             mouse_index) << 1])
+                    else:
+                        values.append(table[base +
+                                            (dark_index(target) << 1) + 1])
+                table[index] = _best(values, turn)
+    return table
+
+
+def write(table, path):
+    # The new file replaces the old one at once, so running processes
+    # keep reading their mapping of the previous file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(table)
+    os.replace(tmp_path, path)
+
+
+class Tablebase:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) != len(MAGIC) + SIZE or \
+                self.data[:len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError("Not a valid tablebase: " + path)
+
+    def probe(self, cats, mouse, cat_turn):
+        """ (cat_wins, plies to the end) with perfect play or None """
+        if not bitboard.cell_is_valid(mouse) or cats >> mouse & 1:
+            return None
+        return decode(self.data[len(MAGIC) +
+                                position_index(cats, mouse, cat_turn)])
+
+    def best_move(self, cats, mouse, cat_turn):
+        """ (origin, target) of the best move or None if the game ended """
+        if bitboard.winner(cats, mouse) is not None:
+            return None
+        best = None
+        best_key = None
+        for origin, target in bitboard.legal_moves(cats, mouse, cat_turn):
+            child = bitboard.apply(cats, mouse, cat_turn, origin, target)
+            cat_wins, distance = self.probe(*child)
+            # Winning moves first (the shortest), then the longest defence
+            if cat_wins == cat_turn:
+                key = (1, -distance)
+            else:
+                key = (0, distance)
+            if best_key is None or key > best_key:
+                best, best_key = (origin, target), key
+        return best
+
+    def close(self):
+        self.data.close()
+
+
+_tablebase = None
+
+
+def get_tablebase():
+    """ Tablebase of settings.TABLEBASE_PATH, or None if it isn't built """
+    global _tablebase
+    if _tablebase is None:
+        try:
+            _tablebase = Tablebase(settings.TABLEBASE_PATH)
+        except (OSError, ValueError):
+            return None
+    return _tablebase
+
+
+def probe(game):
+    """ (cat_wins, plies to the end) for a Game or None """
+    tablebase = get_tablebase()
+    if tablebase is None:
+        return None
+    return tablebase.probe(game.get_cats_mask(), int(game.mouse),
+                           game.cat_turn)
+
+
+def best_move(game):
+    """ (origin, target) of the best move for a Game or None """
+    tablebase = get_tablebase()
+    if tablebase is None:
+        return None
+    return tablebase.best_move(game.get_cats_mask(), int(game.mouse),
+                               game.cat_turn)
@@ -0,0 +1,126 @@
+import importlib
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from . import ai, bitboard, constants
+from . import tests
+from .models import Game, GameStatus
+
+
+class SearchTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+
+    def test1(self):
+        """ The search finds the move that traps the mouse """
+        """
+            |00|xx|02|xx|04|xx|06|xx|
+            |xx|09|xx|11|xx|13|xx|15|
+            |16|xx|18|xx|20|xx|22|xx|
+            |xx|C1|xx|27|xx|29|xx|31|
+            |32|xx|34|xx|C2|xx|38|xx|
+            |xx|41|xx|M |xx|45|xx|47|
+            |48|xx|C3|xx|C4|xx|54|xx|
+            |xx|57|xx|59|xx|61|xx|63|
+        """
+        cats = bitboard.cats_mask(25, 36, 50, 52)
+        move = ai.Search(1).best_move(cats, 43, True)
+        self.assertEqual(move, (25, 34))
+
+    def test2(self):
+        """ The search keeps its time budget """
+        cats = bitboard.cats_mask(0, 2, 4, 6)
+        start = time.monotonic()
+        move = ai.Search(0.1).best_move(cats, 59, True)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertTrue(bitboard.is_legal(cats, 59, True, *move))
+
+    def test3(self):
+        """ The hash of a position doesn't depend on how it was reached """
+        cats = bitboard.cats_mask(0, 2, 4, 6)
+        key = ai.zobrist(cats, 59, True)
+        key ^= ai.CAT_KEYS[0] ^ ai.CAT_KEYS[9] ^ ai.TURN_KEY
+        self.assertEqual(key, ai.zobrist(cats ^ 1 ^ (1 << 9), 59, False))
+
+    def test4(self):
+        """ A win is stored as the distance from the position, so it reads
+        right at any ply """
+        # A win in 3 plies from a position seen at ply 5
+        stored = ai.to_table(ai.WIN - 8, 5)
+        self.assertEqual(stored, ai.WIN - 3)
+        self.assertEqual(ai.from_table(stored, 2), ai.WIN - 5)
+        self.assertEqual(ai.from_table(ai.to_table(8 - ai.WIN, 5), 2),
+                         5 - ai.WIN)
+        self.assertEqual(ai.from_table(ai.to_table(-40, 5), 2), -40)
+
+    def test5(self):
+        """ Every search has its own table and keeps its root move """
+        cats = bitboard.cats_mask(25, 36, 50, 52)
+        first, second = ai.Search(1), ai.Search(1)
+        self.assertEqual(first.best_move(cats, 43, True), (25, 34))
+        self.assertEqual(first.root_move, (25, 34))
+        self.assertTrue(first.table)
+        self.assertEqual(second.table, {})
+
+
+class BotPlayerTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.bot = ai.get_bot_user()
+
+    def test1(self):
+        """ The bot plays its moves as a normal player """
+        game = Game(cat_user=self.bot, mouse_user=self.users[1])
+        game.save()
+        move = ai.play_bot_move(game)
+        self.assertEqual(move.player, self.bot)
+        self.assertEqual(game.moves.count(), 1)
+        self.assertFalse(game.cat_turn)
+
+        # It is not the turn of the bot
+        self.assertIsNone(ai.play_bot_move(game))
+        self.assertEqual(game.moves.count(), 1)
+
+    def test2(self):
+        """ The bot doesn't move in a game that is not active """
+        game = Game(cat_user=self.users[0], mouse_user=self.bot,
+                    status=GameStatus.FINISHED, cat_turn=False)
+        game.save()
+        self.assertIsNone(ai.play_bot_move(game))
+        self.assertEqual(game.moves.count(), 0)
+
+    def test3(self):
+        """ The bot is an inactive user without password, known by its
+        id """
+        self.assertFalse(self.bot.is_active)
+        self.assertFalse(self.bot.has_usable_password())
+        self.assertEqual(ai.get_bot_user(), self.bot)
+        self.assertEqual(ai.get_bot_id(), self.bot.id)
+
+    def test4(self):
+        """ Looking for the bot in a game of people runs no query """
+        game = Game(cat_user=self.users[0], mouse_user=self.users[1])
+        game.save()
+        game = Game.objects.get(id=game.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(ai.play_bot_move(game))
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test5(self):
+        """ The migration of the bot doesn't take the account of a person
+        with its name """
+        migration = importlib.import_module(
+            "datamodel.migrations.0010_bot_user")
+        self.bot.delete()
+        person = User(username=constants.BOT_USERNAME)
+        person.set_password("a password")
+        person.save()
+        with self.assertRaises(RuntimeError):
+            migration.create_bot(apps, None)
+        person.refresh_from_db()
+        self.assertEqual(person.username, constants.BOT_USERNAME)
+        self.assertTrue(person.has_usable_password())
@@ -0,0 +1,93 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from . import benchmark, bitboard
+from .models import GameStatus
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.baseline = os.path.join(self.directory.name, "baseline.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command("benchmark", "--positions", "20", "--games", "5",
+                     "--rounds", "1", "--baseline", self.baseline, *args,
+                     stdout=out)
+        return out.getvalue()
+
+    def test1(self):
+        """ The positions are active and come from legal games, without
+        queries """
+        with self.assertNumQueries(0):
+            positions = benchmark.random_positions(random.Random(1), 50)
+        self.assertEqual(len(positions), 50)
+        for game, move in positions:
+            self.assertEqual(game.status, GameStatus.ACTIVE)
+            self.assertTrue(bitboard.cells_are_valid(game.get_cats_mask()))
+            self.assertIs(move.game, game)
+
+    def test2(self):
+        """ Every benchmark is timed, and the same seed gives the same
+        positions """
+        with self.assertNumQueries(0):
+            results = benchmark.run(20, 5, 1)
+        self.assertEqual(set(results), set(benchmark.NAMES))
+        self.assertTrue(all(value > 0 for value in results.values()))
+        first = benchmark.random_positions(random.Random(5), 10)
+        second = benchmark.random_positions(random.Random(5), 10)
+        self.assertEqual([g.get_array_positions() for g, _ in first],
+                         [g.get_array_positions() for g, _ in second])
+
+    def test3(self):
+        """ A benchmark slower than the threshold is a regression """
+        rows = benchmark.compare({'a': 130, 'b': 110, 'c': 50},
+                                 {'a': 100, 'b': 100}, 0.2)
+        self.assertEqual([(row[0], row[4]) for row in rows],
+                         [('a', True), ('b', False), ('c', False)])
+        self.assertAlmostEqual(rows[0][3], 0.3)
+        self.assertIsNone(rows[2][2])
+
+    def test4(self):
+        """ The command stores the baseline and fails on a regression """
+        with self.assertRaises(CommandError):
+            # There is no baseline yet
+            self.benchmark("--only", "Game.get_position")
+        self.benchmark("--save", "--only", "Game.get_position")
+        with open(self.baseline) as data:
+            self.assertEqual(list(json.load(data)), ["Game.get_position"])
+        self.benchmark("--only", "Game.get_position", "--threshold", "100")
+        with self.assertRaises(CommandError):
+            # Nor a time of this one
+            self.benchmark("--only", "Game.get_moves")
+        benchmark.save_baseline({'Game.get_position': 0.001}, self.baseline)
+        with self.assertRaises(CommandError):
+            self.benchmark("--only", "Game.get_position")
+        with self.assertRaises(CommandError):
+            self.benchmark("--only", "unknown")
+
+    def test5(self):
+        """ The replayed games are finished and packed with snapshots,
+        and their moves can be played again """
+        with self.assertNumQueries(0):
+            games = benchmark.packed_games(random.Random(1), 10)
+            for game, ply in games:
+                self.assertEqual(game.status, GameStatus.FINISHED)
+                self.assertIsNotNone(game.snapshots)
+                self.assertIsNotNone(game.get_position(ply))
+                self.assertEqual(game.get_position(len(game.get_moves()))[:2],
+                                 (game.get_cats_mask(), game.mouse))
+                # The rules play the whole game again
+                final = benchmark.replay(game.get_moves())[1]
+                self.assertEqual(final['mouse'], game.mouse)
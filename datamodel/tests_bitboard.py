@@ -0,0 +1,90 @@
+import random
+
+from django.test import TestCase
+
+from . import bitboard
+from . import tests
+from .models import Game, GameStatus
+
+
+def dark_cells():
+    return [cell for cell in range(64) if (cell // 8) % 2 == cell % 2]
+
+
+def random_position(rnd):
+    pieces = rnd.sample(dark_cells(), 5)
+    return pieces[:4], pieces[4]
+
+
+class BitboardTests(TestCase):
+    def test1(self):
+        """ Only the dark cells are valid """
+        for cell in range(-10, 74):
+            row, col = int(cell / 8), cell % 8
+            valid = 0 <= cell <= 63 and row % 2 == col % 2
+            self.assertEqual(bitboard.cell_is_valid(cell), valid)
+
+    def test2(self):
+        """ The moves never wrap around the board """
+        for cell in dark_cells():
+            for target in bitboard.MOUSE_TARGETS[cell]:
+                self.assertEqual(abs(target // 8 - cell // 8), 1)
+                self.assertEqual(abs(target % 8 - cell % 8), 1)
+            for target in bitboard.CAT_TARGETS[cell]:
+                self.assertIn(target - cell, (7, 9))
+
+    def test3(self):
+        """ The engine agrees with the list based rules """
+        rnd = random.Random(0)
+        for _ in range(2000):
+            cat_cells, mouse = random_position(rnd)
+            cats = bitboard.cats_mask(*cat_cells)
+            pieces = cat_cells + [mouse]
+            alternatives = [mouse + step for step in (-9, -7, 7, 9)
+                            if bitboard.cell_is_valid(mouse + step) and
+                            abs((mouse + step) % 8 - mouse % 8) == 1]
+            trapped = all(cell in cat_cells for cell in alternatives)
+            self.assertEqual(bitboard.mouse_is_trapped(cats, mouse), trapped)
+            self.assertEqual(bitboard.mouse_at_top(cats, mouse),
+                             mouse // 8 <= min(cat_cells) // 8)
+            self.assertEqual(
+                sorted(bitboard.mouse_moves(cats, mouse)),
+                sorted((mouse, cell) for cell in alternatives
+                       if cell not in cat_cells))
+            expected = [(cat, cat + step) for cat in cat_cells
+                        for step in (7, 9)
+                        if bitboard.cell_is_valid(cat + step) and
+                        abs((cat + step) % 8 - cat % 8) == 1 and
+                        cat + step not in pieces]
+            self.assertEqual(sorted(bitboard.cat_moves(cats, mouse)),
+                             sorted(expected))
+
+    def test4(self):
+        """ Apply a move to a position """
+        cats = bitboard.cats_mask(0, 2, 4, 6)
+        cats, mouse, cat_turn = bitboard.apply(cats, 59, True, 0, 9)
+        self.assertEqual(bitboard.cells(cats), [2, 4, 6, 9])
+        self.assertFalse(cat_turn)
+        cats, mouse, cat_turn = bitboard.apply(cats, mouse, cat_turn, 59, 50)
+        self.assertEqual(mouse, 50)
+        self.assertTrue(cat_turn)
+
+
+class GameBitboardTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+
+    def test1(self):
+        """ The board of a game is built from its bitboard """
+        game = Game(cat_user=self.users[0], mouse_user=self.users[1])
+        game.cat1, game.cat2, game.cat3, game.cat4 = 9, 11, 13, 15
+        game.mouse = 36
+        cells = game.get_game_cells()
+        self.assertEqual(len(cells), 64)
+        self.assertEqual(cells[36], -1)
+        self.assertEqual([i for i, cell in enumerate(cells) if cell == 1],
+                         [9, 11, 13, 15])
+        self.assertEqual(game.mouse_alternatives(), [27, 29, 43, 45])
+        self.assertFalse(game.mouse_is_trapped())
+        self.assertFalse(game.mouse_at_top())
+        self.assertNotEqual(game.status, GameStatus.FINISHED)
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from .models import Counter, CounterBuffer, counter_buffer
+
+
+class AtomicCounterTests(TestCase):
+    def setUp(self):
+        Counter.objects.all().delete()
+
+    def test1(self):
+        """ Increasing an existing counter is a single statement """
+        Counter.objects.inc()
+        with self.assertNumQueries(1):
+            self.assertEqual(Counter.objects.inc(), 2)
+
+    def test2(self):
+        """ The increment doesn't use the value read before """
+        Counter.objects.inc()
+        stale = Counter.objects.get(pk=1)
+        Counter.objects.inc()
+        self.assertEqual(Counter.objects.add(1, 1), 3)
+        self.assertEqual(stale.value, 1)
+
+    @override_settings(COUNTER_SHARDS=4)
+    def test3(self):
+        """ With shards the value is the sum of every row """
+        for i in range(1, 21):
+            self.assertEqual(Counter.objects.inc(), i)
+        self.assertEqual(Counter.objects.get_current_value(), 20)
+        self.assertLessEqual(Counter.objects.count(), 4)
+
+
+@override_settings(COUNTER_BUFFER=True, COUNTER_FLUSH_HITS=3,
+                   COUNTER_FLUSH_INTERVAL=60)
+class BufferedCounterTests(TestCase):
+    def setUp(self):
+        Counter.objects.all().delete()
+        self.buffer = CounterBuffer()
+
+    def tearDown(self):
+        self.buffer.flush()
+
+    def test1(self):
+        """ The hits are written every COUNTER_FLUSH_HITS hits """
+        self.assertEqual(self.buffer.inc(), 1)
+        self.assertEqual(self.buffer.inc(), 2)
+        self.assertEqual(Counter.objects.get_current_value(), 0)
+        self.assertEqual(self.buffer.inc(), 3)
+        self.assertEqual(Counter.objects.get_current_value(), 3)
+
+    def test2(self):
+        """ The value shown includes the hits of other processes """
+        self.buffer.inc()
+        Counter.objects.increase(10)
+        self.assertEqual(self.buffer.flush(), 11)
+        self.assertEqual(self.buffer.inc(), 12)
+
+    def test3(self):
+        """ The manager uses the buffer of the process """
+        Counter.objects.inc()
+        self.assertEqual(counter_buffer.flush(), 1)
+        self.assertEqual(Counter.objects.get_current_value(), 1)
+
+    def test4(self):
+        """ The hits of a failed write are written by the next flush """
+        self.buffer.inc()
+        self.buffer.inc()
+        with mock.patch.object(Counter.objects, 'increase',
+                               side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending, 2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(Counter.objects.get_current_value(), 2)
@@ -0,0 +1,57 @@
+import csv
+import json
+from io import StringIO
+
+from django.core.management import call_command
+
+from . import export
+from . import tests
+from .models import Game, GameStatus, Move
+
+
+class ExportTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.games = []
+        for _ in range(5):
+            game = Game.objects.create(
+                cat_user=self.users[0], mouse_user=self.users[1],
+                status=GameStatus.ACTIVE)
+            Move.objects.create(game=game, player=self.users[0],
+                                origin=0, target=9)
+            self.games.append(game)
+        Game.objects.create(cat_user=self.users[0])
+        self.games[0].status = GameStatus.FINISHED
+        self.games[0].save()
+        call_command("pack_moves", "--prune", stdout=StringIO())
+
+    def export(self, *args):
+        out = StringIO()
+        call_command("export_games", *args, stdout=out)
+        return out.getvalue()
+
+    def test1(self):
+        """ A line of NDJSON per game, with its moves """
+        lines = self.export("--chunk", "2").splitlines()
+        self.assertEqual(len(lines), 6)
+        games = [json.loads(line) for line in lines]
+        self.assertEqual([game["id"] for game in games],
+                         sorted(game["id"] for game in games))
+        # Packed and not packed moves
+        self.assertEqual(games[0]["moves"], [[0, 9]])
+        self.assertEqual(games[1]["moves"], [[0, 9]])
+        self.assertEqual(games[1]["cat_user"], self.users[0].username)
+        self.assertIsNone(games[5]["mouse_user"])
+        self.assertEqual(games[5]["moves"], [])
+
+    def test2(self):
+        """ A CSV row per game """
+        rows = list(csv.reader(StringIO(self.export("--format", "csv"))))
+        self.assertEqual(tuple(rows[0]), export.FIELDS)
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[1][-1], "0-9")
+
+    def test3(self):
+        """ The queries depend on the chunks, not on the games """
+        with self.assertNumQueries(4):
+            list(export.iter_games(chunk_size=4))
@@ -0,0 +1,62 @@
+import json
+import os
+import socket
+import tempfile
+
+from django.test import override_settings
+
+from . import tests
+from .hub import GameHub
+from .models import Game, GameStatus
+
+
+class GameHubTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.users[0], mouse_user=self.users[1],
+            status=GameStatus.ACTIVE)
+        self.hub = GameHub()
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return Game.objects.get_state(self.game.id)
+
+    def test1(self):
+        """ Many waiters of a game read it from the DB once """
+        with self.assertNumQueries(1):
+            for _ in range(1000):
+                state = self.hub.get_state(self.game.id, self.load, 60)
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(state, self.game.get_state())
+
+    def test2(self):
+        """ The state is read again when it is too old """
+        self.hub.get_state(self.game.id, self.load, 60)
+        self.hub.get_state(self.game.id, self.load, 0)
+        self.assertEqual(self.loads, 2)
+
+    def test3(self):
+        """ An older state doesn't replace a newer one """
+        state = self.game.get_state()
+        self.assertTrue(self.hub.store(dict(state, version=2)))
+        self.assertFalse(self.hub.store(dict(state, version=1)))
+        self.assertEqual(self.hub.wait(self.game.id, 0, 0)["version"], 2)
+
+    def test4(self):
+        """ The states are sent to the sockets of the other processes """
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(GAME_HUB_SOCKET_DIR=directory):
+            other = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            other.bind(os.path.join(directory, "other.sock"))
+            other.settimeout(5)
+            state = self.game.get_state()
+            self.hub.publish(state)
+            self.assertEqual(json.loads(other.recv(65536).decode()), state)
+
+            # and the states sent by the others are received
+            other.sendto(json.dumps(dict(state, version=5)).encode(),
+                         self.hub.path)
+            self.assertEqual(self.hub.wait(self.game.id, 0, 5)["version"], 5)
+            other.close()
@@ -0,0 +1,138 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from . import elo, export, importer
+from . import tests
+from .models import Game, GameStatus, Move, UserStats
+
+
+class ImportTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        cat, mouse = self.users
+        game = Game.objects.create(cat_user=cat, mouse_user=mouse,
+                                   status=GameStatus.ACTIVE)
+        for i, (origin, target) in enumerate([(0, 9), (59, 50), (2, 11)]):
+            Move.objects.create(game=game, player=self.users[i % 2],
+                                origin=origin, target=target)
+        # The mouse reaches the top
+        game = Game.objects.create(cat_user=cat, mouse_user=mouse,
+                                   status=GameStatus.ACTIVE)
+        for i, (origin, target) in enumerate(
+                [(2, 11), (59, 50), (6, 15), (50, 41), (0, 9), (41, 32),
+                 (9, 18), (32, 25), (11, 20), (25, 16), (4, 11), (16, 25),
+                 (20, 29), (25, 16), (15, 22), (16, 9)]):
+            Move.objects.create(game=game, player=self.users[i % 2],
+                                origin=origin, target=target)
+        Game.objects.create(cat_user=cat)
+        self.lines = list(export.export_lines('ndjson'))
+
+    def import_lines(self, lines, *args):
+        path = self.tmp_file(lines)
+        out, err = StringIO(), StringIO()
+        call_command("import_games", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def tmp_file(self, lines):
+        handle, path = tempfile.mkstemp(suffix=".ndjson")
+        with open(handle, "w") as output:
+            output.writelines(lines)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def exported(self):
+        # The export without the ids of the games
+        games = [json.loads(line) for line in export.export_lines('ndjson')]
+        for game in games:
+            del game["id"]
+        return games
+
+    def test1(self):
+        """ The games imported are the same than the exported """
+        before = self.exported()
+        Game.objects.all().delete()
+        out, err = self.import_lines(self.lines)
+        self.assertIn("3 games and 19 moves imported", out)
+        self.assertEqual(err, "")
+        self.assertEqual(self.exported(), before)
+        finished = Game.objects.get(status=GameStatus.FINISHED)
+        self.assertFalse(finished.cat_wins)
+
+    def test2(self):
+        """ The games with moves not allowed are skipped """
+        game = json.loads(self.lines[0])
+        game["moves"][1] = [59, 43]
+        lines = [json.dumps(game) + "\n", "not json\n"] + self.lines[1:]
+        out, err = self.import_lines(lines)
+        self.assertIn("2 games and 16 moves imported", out)
+        self.assertIn("2 games skipped", out)
+        self.assertIn("Line 1: Move 2 not allowed", err)
+        self.assertIn("Line 2:", err)
+
+    def test3(self):
+        """ New users are created and finished games can be packed """
+        game = json.loads(self.lines[1])
+        game["cat_user"] = "imported_cat"
+        out, _ = self.import_lines([json.dumps(game)], "--packed")
+        self.assertIn("1 games and 0 moves imported", out)
+        game = Game.objects.get(cat_user__username="imported_cat")
+        self.assertEqual(len(game.get_moves()), 16)
+        self.assertFalse(User.objects.get(
+            username="imported_cat").has_usable_password())
+
+    def test4(self):
+        """ The queries of the moves depend on the batches, not on the
+        moves """
+        with CaptureQueriesContext(connection) as queries:
+            importer.import_games(self.lines * 10, batch_size=100)
+        # The games are inserted one by one on the databases that don't
+        # return the ids of a bulk insert
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if 'datamodel_userstats' not in query['sql'] and
+            'INSERT INTO "datamodel_game"' not in query['sql']]), 2)
+        self.assertEqual(Game.objects.count(), 33)
+
+    def test5(self):
+        """ The imported games that are finished count in the stats """
+        Game.objects.all().delete()
+        UserStats.objects.all().delete()
+        # The stats are added to, not computed again from the games
+        other = self.get_or_create_user("other_user_test")
+        UserStats.objects.create(user=other, played=3, wins=2)
+        self.import_lines(self.lines)
+        self.assertEqual(UserStats.objects.get(user=other).played, 3)
+        mouse = UserStats.objects.get(user=self.users[1])
+        cat = UserStats.objects.get(user=self.users[0])
+        self.assertEqual((mouse.played, mouse.wins, mouse.wins_as_mouse,
+                          mouse.streak), (1, 1, 1, 1))
+        self.assertEqual((cat.played, cat.wins, cat.streak), (1, 0, 0))
+        self.assertLess(cat.cat_rating, elo.INITIAL)
+
+    def test6(self):
+        """ The games of users that couldn't sign up are skipped """
+        lines = []
+        for username in ("with space", "x" * 151, 7):
+            game = json.loads(self.lines[2])
+            game["cat_user"] = username
+            lines.append(json.dumps(game) + "\n")
+        out, err = self.import_lines(lines)
+        self.assertIn("0 games and 0 moves imported", out)
+        self.assertIn("3 games skipped", out)
+        for number in (1, 2, 3):
+            self.assertIn("Line %d: Username" % number, err)
+        self.assertFalse(User.objects.filter(username="with space").exists())
+
+    def test7(self):
+        """ The id of a deleted game is not given to an imported one """
+        last_id = Game.objects.order_by('-id').first().id
+        Game.objects.filter(id=last_id).delete()
+        self.import_lines(self.lines[2:])
+        self.assertGreater(Game.objects.order_by('-id').first().id, last_id)
@@ -0,0 +1,38 @@
+from . import tests
+from .models import Game, GameStatus
+
+
+class JoinGameTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.third = self.get_or_create_user('third_user_test')
+
+    def test1(self):
+        """ The mouse takes the newest open game of another cat """
+        Game.objects.create(cat_user=self.users[0])
+        newest = Game.objects.create(cat_user=self.users[0])
+        Game.objects.create(cat_user=self.users[1])
+
+        with self.assertNumQueries(3):
+            game_id = Game.objects.join(self.users[1])
+        self.assertEqual(game_id, newest.id)
+        game = Game.objects.get(id=game_id)
+        self.assertEqual(game.mouse_user, self.users[1])
+        self.assertEqual(game.status, GameStatus.ACTIVE)
+        # The start of the game is a new version
+        self.assertEqual(game.version, newest.version + 1)
+
+    def test2(self):
+        """ Two mice never get the same game """
+        games = [Game.objects.create(cat_user=self.users[0])
+                 for _ in range(2)]
+        first = Game.objects.join(self.users[1])
+        second = Game.objects.join(self.third)
+        self.assertEqual({first, second}, {game.id for game in games})
+        self.assertIsNone(Game.objects.join(self.third))
+
+    def test3(self):
+        """ A game that already has a mouse is not open """
+        taken = Game.objects.create(cat_user=self.users[0])
+        Game.objects.filter(id=taken.id).update(mouse_user=self.third)
+        self.assertIsNone(Game.objects.join(self.users[1]))
@@ -0,0 +1,121 @@
+import random
+from io import StringIO
+
+from django.core.management import call_command
+
+from . import bitboard, movelog
+from . import tests
+from .models import Game, GameStatus, Move
+
+
+class MoveLogTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.users[0], mouse_user=self.users[1],
+            status=GameStatus.ACTIVE)
+        self.moves = [(0, 9), (59, 50), (2, 11), (50, 43)]
+        for i, (origin, target) in enumerate(self.moves):
+            Move.objects.create(game=self.game, player=self.users[i % 2],
+                                origin=origin, target=target)
+
+    def pack(self, *args):
+        out = StringIO()
+        call_command("pack_moves", *args, stdout=out)
+        return out.getvalue()
+
+    def test1(self):
+        """ A move is one byte """
+        data = movelog.pack(self.moves)
+        self.assertEqual(len(data), len(self.moves))
+        self.assertEqual(movelog.unpack(data), self.moves)
+        with self.assertRaises(ValueError):
+            movelog.pack([(0, 18)])
+
+    def test2(self):
+        """ Only the finished games are packed """
+        self.assertIn("0 games packed", self.pack())
+        self.game.status = GameStatus.FINISHED
+        self.game.save()
+        self.assertIn("1 games packed, 0 moves deleted", self.pack())
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(bytes(game.packed_moves),
+                         movelog.pack(self.moves))
+        self.assertEqual(game.moves.count(), len(self.moves))
+
+    def test3(self):
+        """ The moves are the same after the rows are deleted """
+        self.game.status = GameStatus.FINISHED
+        self.game.save()
+        self.assertIn("1 games packed, 4 moves deleted",
+                      self.pack("--prune"))
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.moves.count(), 0)
+        self.assertEqual(game.get_moves(), self.moves)
+
+
+class SnapshotTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        # A long game of random moves and every position of it
+        rand = random.Random(3)
+        cats, mouse, cat_turn = bitboard.cats_mask(0, 2, 4, 6), 59, True
+        self.positions = [(cats, mouse, cat_turn)]
+        self.moves = []
+        while len(self.moves) < 60:
+            moves = bitboard.legal_moves(cats, mouse, cat_turn)
+            if not moves or bitboard.winner(cats, mouse) is not None:
+                break
+            move = rand.choice(moves)
+            self.moves.append(move)
+            cats, mouse, cat_turn = bitboard.apply(cats, mouse, cat_turn,
+                                                   *move)
+            self.positions.append((cats, mouse, cat_turn))
+        cells = bitboard.cells(cats)
+        self.game = Game.objects.create(
+            cat_user=self.users[0], mouse_user=self.users[1],
+            status=GameStatus.FINISHED, cat1=cells[0], cat2=cells[1],
+            cat3=cells[2], cat4=cells[3], mouse=mouse, cat_turn=cat_turn)
+
+    def test1(self):
+        """ Every position is found from the snapshots """
+        packed = movelog.pack(self.moves)
+        cats, mouse, _ = self.positions[-1]
+        snapshots = movelog.snapshots(cats, mouse, self.moves)
+        self.assertEqual(len(snapshots), movelog.SNAPSHOT.size *
+                         (len(self.moves) // movelog.SNAPSHOT_INTERVAL + 1))
+        for ply, position in enumerate(self.positions):
+            self.assertEqual(movelog.position_at(packed, snapshots, ply),
+                             position[:2])
+
+    def test2(self):
+        """ The positions of a packed game are read without more queries """
+        Move.objects.bulk_create(
+            Move(game=self.game, player=self.users[i % 2], origin=origin,
+                 target=target)
+            for i, (origin, target) in enumerate(self.moves))
+        self.assertEqual(self.game.get_position(5), self.positions[5])
+        call_command("pack_moves", "--prune", stdout=StringIO())
+        game = Game.objects.get(id=self.game.id)
+        with self.assertNumQueries(0):
+            for ply, position in enumerate(self.positions):
+                self.assertEqual(game.get_position(ply), position)
+            self.assertIsNone(game.get_position(len(self.positions)))
+
+    def test3(self):
+        """ A game packed without snapshots gets them, from its packed
+        moves """
+        Game.objects.filter(id=self.game.id).update(
+            packed_moves=movelog.pack(self.moves))
+        out = StringIO()
+        call_command("pack_moves", stdout=out)
+        self.assertIn("0 games packed, 0 moves deleted, 1 games with new "
+                      "snapshots", out.getvalue())
+        game = Game.objects.get(id=self.game.id)
+        self.assertIsNotNone(game.snapshots)
+        with self.assertNumQueries(0):
+            for ply, position in enumerate(self.positions):
+                self.assertEqual(game.get_position(ply), position)
+        out = StringIO()
+        call_command("pack_moves", stdout=out)
+        self.assertIn("0 games with new snapshots", out.getvalue())
@@ -0,0 +1,78 @@
+from django.core.exceptions import ValidationError
+
+from . import tests
+from .models import Game, GameStatus, Move, UserStats
+
+
+class MoveCommitTests(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.users[0], mouse_user=self.users[1],
+            status=GameStatus.ACTIVE)
+        # The players have stats, a finished game updates them
+        for user in self.users:
+            UserStats.objects.create(user=user)
+
+    def test1(self):
+        """ A move is one UPDATE of the game and one INSERT """
+        game = Game.objects.get(id=self.game.id)
+        with self.assertNumQueries(2):
+            Move.objects.create(game=game, player=self.users[0],
+                                origin=0, target=9)
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.cat1, 9)
+        self.assertFalse(game.cat_turn)
+
+    def test2(self):
+        """ Two moves against the same state: only the first is applied """
+        game_a = Game.objects.get(id=self.game.id)
+        game_b = Game.objects.get(id=self.game.id)
+        Move.objects.create(game=game_a, player=self.users[0],
+                            origin=0, target=9)
+        with self.assertRaisesRegex(ValidationError, "game changed"):
+            Move.objects.create(game=game_b, player=self.users[0],
+                                origin=2, target=11)
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(self.get_array_positions(game), [9, 2, 4, 6, 59])
+        self.assertEqual(game.moves.count(), 1)
+
+    def test3(self):
+        """ A cat can't move from an empty cell """
+        with self.assertRaisesRegex(ValidationError, tests.MSG_ERROR_MOVE):
+            Move.objects.create(game=self.game, player=self.users[0],
+                                origin=16, target=25)
+        self.assertEqual(self.game.moves.count(), 0)
+
+    def test4(self):
+        """ The move that traps the mouse finishes the game in the DB """
+        self.game.cat1, self.game.cat2 = 25, 36
+        self.game.cat3, self.game.cat4 = 50, 52
+        self.game.mouse = 43
+        self.game.save()
+        # and updates the stats and ratings of both players
+        with self.assertNumQueries(5):
+            Move.objects.create(game=self.game, player=self.users[0],
+                                origin=25, target=34)
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.status, GameStatus.FINISHED)
+        self.assertTrue(game.cat_wins)
+        self.assertEqual(UserStats.objects.get(user=self.users[0]).wins, 1)
+
+    def test5(self):
+        """ The move that takes the mouse above the cats finishes the game """
+        self.game.cat1, self.game.cat2 = 11, 13
+        self.game.cat3, self.game.cat4 = 25, 27
+        self.game.mouse = 18
+        self.game.cat_turn = False
+        self.game.save()
+        Move.objects.create(game=self.game, player=self.users[1],
+                            origin=18, target=9)
+        game = Game.objects.get(id=self.game.id)
+        self.assertEqual(game.status, GameStatus.FINISHED)
+        self.assertFalse(game.cat_wins)
+
+        # No more moves once the game is finished
+        with self.assertRaisesRegex(ValidationError, tests.MSG_ERROR_MOVE):
+            Move.objects.create(game=game, player=self.users[0],
+                                origin=11, target=20)
@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from . import ai, elo
+from . import tests
+from .models import Game, GameStatus, Move, UserStats
+
+
+class FinishGameTest(tests.BaseModelTest):
+    def setUp(self):
+        super().setUp()
+        self.cat, self.mouse = self.users
+
+    def finish_game(self, cat_wins):
+        # A game one move from its end
+        game = Game.objects.create(cat_user=self.cat, mouse_user=self.mouse,
+                                   status=GameStatus.ACTIVE)
+        if cat_wins:
+            game.cat1, game.cat2, game.cat3, game.cat4 = 25, 36, 50, 52
+            game.mouse = 43
+            game.save()
+            Move.objects.create(game=game, player=self.cat,
+                                origin=25, target=34)
+        else:
+            game.cat1, game.cat2, game.cat3, game.cat4 = 11, 13, 25, 27
+            game.mouse, game.cat_turn = 18, False
+            game.save()
+            Move.objects.create(game=game, player=self.mouse,
+                                origin=18, target=9)
+
+
+class UserStatsTests(FinishGameTest):
+    def test1(self):
+        """ The move that ends a game updates the stats """
+        self.assertFalse(UserStats.objects.exists())
+        self.finish_game(cat_wins=True)
+        self.finish_game(cat_wins=True)
+        cat = UserStats.objects.get(user=self.cat)
+        mouse = UserStats.objects.get(user=self.mouse)
+        self.assertEqual((cat.played, cat.wins, cat.wins_as_cat,
+                          cat.streak), (2, 2, 2, 2))
+        self.assertEqual((mouse.played, mouse.wins, mouse.streak),
+                         (2, 0, 0))
+
+    def test2(self):
+        """ A defeat ends the streak """
+        self.finish_game(cat_wins=True)
+        self.finish_game(cat_wins=False)
+        cat = UserStats.objects.get(user=self.cat)
+        mouse = UserStats.objects.get(user=self.mouse)
+        self.assertEqual((cat.wins, cat.streak), (1, 0))
+        self.assertEqual((mouse.wins, mouse.wins_as_mouse, mouse.streak),
+                         (1, 1, 1))
+
+    def test3(self):
+        """ The leaderboard is ordered by wins """
+        self.finish_game(cat_wins=False)
+        self.finish_game(cat_wins=False)
+        self.finish_game(cat_wins=True)
+        with self.assertNumQueries(1):
+            leaders = [stats.user for stats in
+                       UserStats.objects.leaderboard(10)]
+        self.assertEqual(leaders, [self.mouse, self.cat])
+        self.assertEqual(len(UserStats.objects.leaderboard(1)), 1)
+
+        # The bot is not on it
+        UserStats.objects.create(user=ai.get_bot_user(), wins=10)
+        self.assertEqual([stats.user for stats in
+                          UserStats.objects.leaderboard(10)],
+                         [self.mouse, self.cat])
+
+    def test4(self):
+        """ Moves that don't end the game don't change the stats """
+        game = Game.objects.create(cat_user=self.cat, mouse_user=self.mouse,
+                                   status=GameStatus.ACTIVE)
+        Move.objects.create(game=game, player=self.cat, origin=0, target=9)
+        self.assertFalse(UserStats.objects.exists())
+
+
+class RatingTests(FinishGameTest):
+    def ratings(self):
+        cat = UserStats.objects.get(user=self.cat)
+        mouse = UserStats.objects.get(user=self.mouse)
+        return cat.cat_rating, mouse.mouse_rating
+
+    def test1(self):
+        """ The winner gets the points the loser loses """
+        self.finish_game(cat_wins=True)
+        cat, mouse = self.ratings()
+        self.assertAlmostEqual(cat, elo.INITIAL + elo.K / 2)
+        self.assertAlmostEqual(mouse, elo.INITIAL - elo.K / 2)
+        # A win against a better player gives more points
+        self.finish_game(cat_wins=False)
+        self.assertGreater(self.ratings()[1] - mouse, elo.K / 2)
+
+    def test2(self):
+        """ The ratings computed from the history are the same """
+        for cat_wins in (True, False, False, True, True):
+            self.finish_game(cat_wins)
+        ratings = self.ratings()
+        UserStats.objects.update(cat_rating=0, mouse_rating=0)
+        out = StringIO()
+        call_command("recompute_ratings", "--chunk", "2", stdout=out)
+        self.assertIn("2 users rated", out.getvalue())
+        for rating, expected in zip(self.ratings(), ratings):
+            self.assertAlmostEqual(rating, expected)
+
+    def test3(self):
+        """ A mouse joins the game of the cat with the closest rating """
+        third = self.get_or_create_user("third_user_test")
+        UserStats.objects.create(user=self.cat, cat_rating=1800)
+        UserStats.objects.create(user=third, cat_rating=1450)
+        UserStats.objects.create(user=self.mouse, mouse_rating=1400)
+        close = Game.objects.create(cat_user=third)
+        Game.objects.create(cat_user=self.cat)
+        self.assertEqual(Game.objects.join(self.mouse), close.id)
+
+    def test4(self):
+        """ The stats computed again from the games are the ones kept
+        with each move """
+        for cat_wins in (True, False, False, True, True):
+            self.finish_game(cat_wins)
+        fields = ('user_id', 'played', 'wins', 'wins_as_cat',
+                  'wins_as_mouse', 'streak', 'cat_rating', 'mouse_rating')
+        kept = list(UserStats.objects.order_by('user_id')
+                    .values_list(*fields))
+        UserStats.objects.all().delete()
+        out = StringIO()
+        call_command("recompute_stats", stdout=out)
+        self.assertIn("2 users", out.getvalue())
+        rebuilt = list(UserStats.objects.order_by('user_id')
+                       .values_list(*fields))
+        for row, expected in zip(rebuilt, kept):
+            self.assertEqual(row[:6], expected[:6])
+            self.assertAlmostEqual(row[6], expected[6])
+            self.assertAlmostEqual(row[7], expected[7])
@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from django.test import TestCase
+
+from . import bitboard, tablebase
+
+
+class TablebaseTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp_dir.name, "tablebase.bin")
+        tablebase.write(tablebase.solve(), cls.path)
+        cls.tablebase = tablebase.Tablebase(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tablebase.close()
+        cls.tmp_dir.cleanup()
+        super().tearDownClass()
+
+    def test1(self):
+        """ Every cat configuration has its own rank """
+        ranks = set()
+        for a, b, c, d in [(0, 1, 2, 3), (28, 29, 30, 31), (0, 9, 20, 31)]:
+            cats = bitboard.cats_mask(*(tablebase.dark_cell(i)
+                                        for i in (a, b, c, d)))
+            ranks.add(tablebase.cats_rank(cats))
+        self.assertEqual(len(ranks), 3)
+        self.assertEqual(min(ranks), 0)
+        self.assertEqual(max(ranks), tablebase.N_CATS - 1)
+
+    def test2(self):
+        """ Terminal positions are solved at distance 0 """
+        # The mouse is trapped in the corner
+        cats = bitboard.cats_mask(0, 2, 4, 54)
+        self.assertEqual(self.tablebase.probe(cats, 63, False), (True, 0))
+        # The mouse is above the cats
+        cats = bitboard.cats_mask(25, 27, 29, 31)
+        self.assertEqual(self.tablebase.probe(cats, 9, True), (False, 0))
+        # Not a position
+        self.assertIsNone(self.tablebase.probe(cats, 25, True))
+
+    def test3(self):
+        """ The cats win from the initial position """
+        cats = bitboard.cats_mask(0, 2, 4, 6)
+        cat_wins, distance = self.tablebase.probe(cats, 59, True)
+        self.assertTrue(cat_wins)
+
+        # Following the best moves ends the game in that many plies
+        mouse, cat_turn = 59, True
+        for _ in range(distance):
+            origin, target = self.tablebase.best_move(cats, mouse, cat_turn)
+            self.assertTrue(bitboard.is_legal(cats, mouse, cat_turn,
+                                              origin, target))
+            cats, mouse, cat_turn = bitboard.apply(cats, mouse, cat_turn,
+                                                   origin, target)
+        self.assertTrue(bitboard.winner(cats, mouse))
+        self.assertIsNone(self.tablebase.best_move(cats, mouse, cat_turn))
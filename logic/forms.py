@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth import password_validation, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.core.exceptions import ValidationError
+from datamodel import constants
 from datamodel.models import Move
 
 
@@ -18,6 +19,14 @@ class SignupForm(UserCreationForm):
         super(SignupForm, self).__init__(*args, **kwargs)
         self.fields['password1'].required = False
 
+    def clean_username(self):
+        username = self.cleaned_data.get('username')
+        # The name of the bot (see datamodel.ai)
+        if username and username.lower() == constants.BOT_USERNAME:
+            raise ValidationError(constants.MSG_ERROR_RESERVED_USERNAME,
+                                  code='reserved')
+        return username
+
     def clean_password(self):
         password = self.cleaned_data.get('password')
         password_validation.validate_password(password)
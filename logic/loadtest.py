@@ -0,0 +1,262 @@
+"""
+    Load test of a running server: pairs of simulated users play whole
+    games at once through the same requests as the browsers.
+
+    Every pair signs up a cat and a mouse. The cat creates its games and
+    the mouse joins the open ones (any of them, as the join of the site
+    does). Both play random legal moves with move_service as JSON, load
+    show_game_service before each move and wait for the moves of the
+    other with the long poll. Each user is a thread with its own cookies.
+    The time of every request is kept by endpoint to report the
+    throughput and the percentiles.
+"""
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from datamodel import bitboard
+from datamodel.models import GameStatus
+
+PASSWORD = "Load-test-2019"
+START_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+# Status of the answers that are part of the game and not errors: not
+# modified and the conflict of a move sent with an old board
+EXPECTED_STATUS = (304, 409)
+PERCENTILES = (50, 95, 99)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # endpoint -> times of its requests, in seconds
+        self.times = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.games = defaultdict(int)
+
+    def add(self, endpoint, seconds, error):
+        with self.lock:
+            self.times[endpoint].append(seconds)
+            if error:
+                self.errors[endpoint] += 1
+
+    def add_game(self, result):
+        with self.lock:
+            self.games[result] += 1
+
+
+def percentile(values, percent):
+    """ Nearest rank percentile of the sorted values """
+    if not values:
+        return 0.0
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class Player:
+    """ A user of the site, with its own session """
+
+    def __init__(self, url, username, stats, timeout):
+        self.url = url.rstrip("/")
+        self.username = username
+        self.stats = stats
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies))
+        self.etag = None
+        self.played = set()
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return ""
+
+    def request(self, endpoint, path, form=None, data=None, headers=None):
+        """ Sends a request and keeps its time. Returns the status, the
+        body and the final URL after the redirects """
+        headers = dict(headers or {})
+        body = None
+        if form is not None:
+            form = dict(form, csrfmiddlewaretoken=self.csrf_token())
+            body = urllib.parse.urlencode(form).encode("utf-8")
+        elif data is not None:
+            body = json.dumps(data).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+            headers["X-CSRFToken"] = self.csrf_token()
+        if body is not None:
+            headers["Referer"] = self.url + path
+        request = urllib.request.Request(self.url + path, data=body,
+                                         headers=headers)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+                final = response.geturl()
+                response_headers = response.headers
+        except urllib.error.HTTPError as err:
+            status, content, final = err.code, err.read(), err.geturl()
+            response_headers = err.headers
+        except OSError:
+            self.stats.add(endpoint, time.perf_counter() - start, True)
+            raise
+        self.stats.add(endpoint, time.perf_counter() - start,
+                       status >= 400 and status not in EXPECTED_STATUS)
+        if endpoint == "show_game" and response_headers.get("ETag"):
+            self.etag = response_headers["ETag"]
+        return status, content, final
+
+    def signup(self):
+        self.request("signup_form", "/signup/")
+        self.request("signup", "/signup/",
+                     form={"username": self.username, "password": PASSWORD,
+                           "password2": PASSWORD})
+        if not any(cookie.name == "sessionid" for cookie in self.cookies):
+            raise RuntimeError("%s could not sign up" % self.username)
+
+    def get_state(self, game_id):
+        status, content, _ = self.request("game_state",
+                                          "/api/game/%d/" % game_id)
+        if status != 200:
+            return None
+        return json.loads(content.decode("utf-8"))
+
+    def create_game(self):
+        _, content, _ = self.request("create_game", "/create_game/")
+        match = re.search(rb"Game <b>(\d+)</b>", content)
+        if match is None:
+            raise RuntimeError("%s could not create a game" % self.username)
+        game_id = int(match.group(1))
+        # It starts when a mouse joins it
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            state = self.get_state(game_id)
+            if state is not None and state["status"] != GameStatus.CREATED:
+                return game_id
+            time.sleep(POLL_INTERVAL)
+        raise RuntimeError("Nobody joined the game %d" % game_id)
+
+    def join_game(self):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            _, content, final = self.request("join_game", "/join_game/")
+            if not final.endswith("/join_game/"):
+                # Redirected to the list of games, the new one is the
+                # active game not played yet
+                ids = sorted(set(int(game_id) for game_id in re.findall(
+                    rb'href="/select_game/(\d+)/"', content)), reverse=True)
+                for game_id in ids:
+                    if game_id in self.played:
+                        continue
+                    state = self.get_state(game_id)
+                    if state is not None and \
+                            state["status"] == GameStatus.ACTIVE:
+                        return game_id
+            time.sleep(POLL_INTERVAL)
+        raise RuntimeError("%s found no game to join" % self.username)
+
+    def wait(self, game_id, version):
+        status, content, _ = self.request(
+            "wait_move", "/show_game/%d/wait/?version=%d" % (game_id, version))
+        if status != 200:
+            return None
+        return json.loads(content.decode("utf-8"))["state"]
+
+    def play(self, game_id, cat):
+        """ Plays the game until it finishes. Returns 'cat' or 'mouse' (the
+        winner), or 'stuck' if a player has no moves or it fails """
+        self.played.add(game_id)
+        self.etag = None
+        self.request("select_game", "/select_game/%d/" % game_id)
+        state = self.wait(game_id, -1)
+        while state is not None and state["status"] != GameStatus.FINISHED:
+            moves = bitboard.legal_moves(state["cats"], state["mouse"],
+                                         state["cat_turn"])
+            if not moves:
+                return "stuck"
+            headers = {"If-None-Match": self.etag} if self.etag else {}
+            self.request("show_game", "/show_game/", headers=headers)
+            if state["cat_turn"] != cat:
+                state = self.wait(game_id, state["version"])
+                continue
+            origin, target = random.choice(moves)
+            status, content, _ = self.request(
+                "move", "/move/", data={"origin": origin, "target": target})
+            if status not in (200, 409):
+                return "stuck"
+            state = json.loads(content.decode("utf-8"))["state"]
+        return state["winner"] if state is not None else "stuck"
+
+
+def play_games(player, games, cat):
+    for _ in range(games):
+        if cat:
+            game_id = player.create_game()
+        else:
+            game_id = player.join_game()
+        result = player.play(game_id, cat)
+        if cat:
+            player.stats.add_game(result)
+
+
+def run(url, pairs, games, timeout=60, prefix=None):
+    """ Plays `games` games with each of `pairs` pairs of new users.
+    Returns the Stats, the seconds it took and the errors of the
+    players """
+    prefix = prefix or "load%d" % int(time.time())
+    stats = Stats()
+    players = []
+    for pair in range(pairs):
+        for role in ("cat", "mouse"):
+            players.append(Player(url, "%s_%d_%s" % (prefix, pair, role),
+                                  stats, timeout))
+
+    def start(player):
+        player.signup()
+        play_games(player, games, player.username.endswith("_cat"))
+
+    failures = []
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(players)) as executor:
+        for future in [executor.submit(start, player) for player in players]:
+            try:
+                future.result()
+            except (RuntimeError, OSError, ValueError, KeyError) as err:
+                failures.append(str(err))
+    return stats, time.perf_counter() - begin, failures
+
+
+def report(stats, seconds):
+    """ Lines of the report: requests, errors, requests per second and
+    percentiles in milliseconds of each endpoint, and the total """
+    columns = ["endpoint", "requests", "errors", "req/s"] + \
+        ["p%d ms" % percent for percent in PERCENTILES]
+    rows = []
+    total = 0
+    for endpoint in sorted(stats.times):
+        times = sorted(stats.times[endpoint])
+        total += len(times)
+        rows.append([endpoint, str(len(times)), str(stats.errors[endpoint]),
+                     "%.1f" % (len(times) / seconds)] +
+                    ["%.1f" % (percentile(times, percent) * 1000)
+                     for percent in PERCENTILES])
+    rows.append(["total", str(total), str(sum(stats.errors.values())),
+                 "%.1f" % (total / seconds)] + [""] * len(PERCENTILES))
+    widths = [max(len(row[i]) for row in [columns] + rows)
+              for i in range(len(columns))]
+    lines = ["  ".join(value.ljust(width) if i == 0 else value.rjust(width)
+                       for i, (value, width) in
+                       enumerate(zip(row, widths))).rstrip()
+             for row in [columns] + rows]
+    games = ", ".join("%s %d" % item for item in sorted(stats.games.items()))
+    lines.append("games: %s in %.1f s" % (games or "none", seconds))
+    return lines
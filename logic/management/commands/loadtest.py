@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from logic import loadtest
+
+
+class Command(BaseCommand):
+    help = "Play whole games with pairs of simulated users against a " \
+        "running server and report the latency of each endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000",
+                            help="Address of the server")
+        parser.add_argument("--pairs", type=int, default=10,
+                            help="Pairs of users playing at once")
+        parser.add_argument("--games", type=int, default=1,
+                            help="Games of each pair")
+        parser.add_argument("--timeout", type=float, default=60,
+                            help="Seconds to wait for each request")
+        parser.add_argument("--prefix", help="Start of the usernames, "
+                            "they must not exist")
+
+    def handle(self, *args, **options):
+        if options["pairs"] < 1 or options["games"] < 1:
+            raise CommandError("--pairs and --games must be positive")
+        stats, seconds, failures = loadtest.run(
+            options["url"], options["pairs"], options["games"],
+            options["timeout"], options["prefix"])
+        for failure in failures:
+            self.stderr.write(failure)
+        for line in loadtest.report(stats, seconds):
+            self.stdout.write(line)
@@ -0,0 +1,278 @@
+"""
+    Histograms of the requests of each view: latency, number and time of
+    the queries and size of the response, in Prometheus text format.
+
+    MetricsMiddleware adds every request to the histograms of this
+    process. A streaming response is added when its body is sent, with
+    the queries that the body runs. With settings.METRICS_DIR each
+    process also writes them every METRICS_WRITE_INTERVAL seconds to
+    <METRICS_DIR>/<pid>-<start id>.json, and the /metrics page adds the
+    files of every process. The files not written for STALE_INTERVALS
+    intervals are of processes that ended: their counts are added to
+    <METRICS_DIR>/ended.json and they are deleted, so the totals never
+    go down when a worker is replaced.
+"""
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+
+STALE_INTERVALS = 3
+# Counts of the processes that ended, and the lock to add them
+ENDED_NAME = "ended.json"
+LOCK_NAME = "ended.lock"
+
+# name: (help, upper bounds of the buckets)
+HISTOGRAMS = {
+    'view_request_seconds': (
+        "Time to answer a request",
+        (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5,
+         5, 10)),
+    'view_queries': (
+        "Queries of a request",
+        (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)),
+    'view_query_seconds': (
+        "Time of the queries of a request",
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+         1)),
+    'view_response_bytes': (
+        "Size of the response",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576)),
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (name, view) -> [bucket counts..., count above the last bound,
+        # sum of the values]
+        self.histograms = {}
+        # Process of the writer thread and name of its file
+        self.pid = None
+        self.name = None
+
+    def observe(self, view, values):
+        """ Adds the values ({name: value}) of a request of a view """
+        with self.lock:
+            for name, value in values.items():
+                bounds = HISTOGRAMS[name][1]
+                key = (name, view)
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = \
+                        [0] * (len(bounds) + 2)
+                histogram[bisect_left(bounds, value)] += 1
+                histogram[-1] += value
+        if settings.METRICS_DIR and self.pid != os.getpid():
+            self.start_writer()
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(histogram)
+                    for key, histogram in self.histograms.items()}
+
+    def start_writer(self):
+        # Once per process (gunicorn forks the workers). A new process
+        # with the pid of an old one has another file, so its counters
+        # don't replace the old ones
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.name = "%d-%s.json" % (self.pid, uuid.uuid4().hex[:12])
+        thread = threading.Thread(target=self.write_every_interval,
+                                  daemon=True)
+        thread.start()
+
+    def write_every_interval(self):
+        # Also without requests, so only the files of the processes that
+        # ended get old
+        while True:
+            try:
+                self.write()
+            except OSError:
+                pass
+            time.sleep(settings.METRICS_WRITE_INTERVAL)
+
+    def write(self):
+        # The histograms of this process, replaced at once
+        directory = settings.METRICS_DIR
+        if not directory or self.name is None:
+            return
+        os.makedirs(directory, exist_ok=True)
+        write_histograms(self.snapshot(), directory, self.name)
+
+    def collect(self):
+        """ Histograms of every process, or of this one without
+        METRICS_DIR """
+        histograms = self.snapshot()
+        directory = settings.METRICS_DIR
+        if not directory:
+            return histograms
+        oldest = time.time() - \
+            STALE_INTERVALS * settings.METRICS_WRITE_INTERVAL
+        for name in os.listdir(directory):
+            if name in (self.name, ENDED_NAME) or not name.endswith(".json"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < oldest:
+                    # Its process ended
+                    self.fold(directory, name)
+                    continue
+                add_histograms(histograms, read_histograms(path))
+            except (OSError, ValueError):
+                continue
+        try:
+            add_histograms(histograms, read_histograms(
+                os.path.join(directory, ENDED_NAME)))
+        except (OSError, ValueError):
+            pass
+        return histograms
+
+    def fold(self, directory, name):
+        # Adds the file of a process that ended to the counts of the
+        # ended ones and deletes it. The lock keeps two processes from
+        # adding the same file
+        with open(os.path.join(directory, LOCK_NAME), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            path = os.path.join(directory, name)
+            try:
+                histograms = read_histograms(path)
+            except FileNotFoundError:
+                # Another process added it
+                return
+            except ValueError:
+                histograms = {}
+            ended = os.path.join(directory, ENDED_NAME)
+            try:
+                add_histograms(histograms, read_histograms(ended))
+            except FileNotFoundError:
+                pass
+            write_histograms(histograms, directory, ENDED_NAME)
+            os.unlink(path)
+
+    def render(self):
+        """ Every histogram in Prometheus text format """
+        histograms = self.collect()
+        lines = []
+        for name, (help_text, bounds) in HISTOGRAMS.items():
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s histogram" % name)
+            for (metric, view), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                label = view.replace("\\", "\\\\").replace('"', '\\"')
+                total = 0
+                for bound, count in zip(bounds, histogram):
+                    total += count
+                    lines.append('%s_bucket{view="%s",le="%s"} %d' %
+                                 (name, label, bound, total))
+                total += histogram[len(bounds)]
+                lines.append('%s_bucket{view="%s",le="+Inf"} %d' %
+                             (name, label, total))
+                lines.append('%s_sum{view="%s"} %s' %
+                             (name, label, histogram[-1]))
+                lines.append('%s_count{view="%s"} %d' %
+                             (name, label, total))
+        return "\n".join(lines) + "\n"
+
+
+def read_histograms(path):
+    """ Histograms of a file, without the ones of other buckets """
+    with open(path) as data:
+        rows = json.load(data)
+    return {(metric, view): histogram for metric, view, histogram in rows
+            if metric in HISTOGRAMS and
+            len(histogram) == len(HISTOGRAMS[metric][1]) + 2}
+
+
+def write_histograms(histograms, directory, name):
+    # Replaced at once, a reader never sees half a file
+    data = [[metric, view, histogram]
+            for (metric, view), histogram in histograms.items()]
+    handle, path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "w") as output:
+        json.dump(data, output)
+    os.replace(path, os.path.join(directory, name))
+
+
+def add_histograms(histograms, other):
+    """ Adds the histograms of `other` to `histograms` """
+    for key, histogram in other.items():
+        if key not in histograms:
+            histograms[key] = histogram
+        else:
+            histograms[key] = [a + b for a, b in
+                               zip(histograms[key], histogram)]
+
+
+registry = Registry()
+
+
+class QueryCounter:
+    # Execute wrapper of the connection, counts and times the queries
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unknown"
+        if response.streaming:
+            # Its body runs its queries while it is sent
+            response.streaming_content = self.observe_stream(
+                response.streaming_content, view, queries, start)
+        else:
+            registry.observe(view, self.values(queries, start,
+                                               len(response.content)))
+        return response
+
+    @staticmethod
+    def values(queries, start, size):
+        values = {'view_request_seconds': time.perf_counter() - start,
+                  'view_queries': queries.count,
+                  'view_query_seconds': queries.seconds}
+        if size is not None:
+            values['view_response_bytes'] = size
+        return values
+
+    @classmethod
+    def observe_stream(cls, content, view, queries, start):
+        # A response the client didn't read to the end has no size
+        size = 0
+        sent = False
+        try:
+            with connection.execute_wrapper(queries):
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            sent = True
+        finally:
+            registry.observe(view, cls.values(queries, start,
+                                              size if sent else None))
@@ -0,0 +1,734 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from datamodel import ai, constants, export
+from datamodel.hub import hub
+
+from datamodel.models import Game, GameStatus, Move, UserStats
+
+from . import loadtest
+from . import metrics
+from . import tests_services
+from . import views
+from .forms import SignupForm
+
+SELECT_GAME_SERVICE = "select_game"
+SHOW_GAME_SERVICE = "show_game"
+GAME_STATE_SERVICE = "game_state"
+MOVE_SERVICE = "move"
+CREATE_BOT_GAME_SERVICE = "create_bot_game"
+EXPORT_SERVICE = "export"
+LEADERBOARD_SERVICE = "leaderboard"
+METRICS_SERVICE = "metrics"
+LANDING_SERVICE = "landing"
+REPLAY_MOVES_SERVICE = "replay_moves"
+REPLAY_POSITION_SERVICE = "replay_position"
+WAIT_MOVE_SERVICE = "wait_move"
+WATCH_GAMES_SERVICE = "watch_games"
+WATCH_GAME_SERVICE = "watch_game"
+GET_MOVE_SERVICE = "get_move"
+REPLAY_SERVICE = "replay"
+
+
+class SelectGamePagesTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.games = []
+        for i in range(12):
+            status = GameStatus.ACTIVE if i % 3 else GameStatus.FINISHED
+            if i % 2:
+                game = Game(cat_user=self.user1, mouse_user=self.user2)
+            else:
+                game = Game(cat_user=self.user2, mouse_user=self.user1)
+            game.status = status
+            game.save()
+            self.games.append(game)
+        # Games of other users or not started are not listed
+        Game.objects.create(cat_user=self.user2)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def get_page(self, **params):
+        response = self.client1.get(reverse(SELECT_GAME_SERVICE), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def test1(self):
+        """ The pages go through every game, active ones first """
+        self.loginTestUser(self.client1, self.user1)
+        expected = sorted(self.games, key=lambda game: (game.status,
+                                                        -game.id))
+        seen = []
+        context = self.get_page()
+        self.assertIsNone(context['previous_cursor'])
+        while True:
+            seen += context['games']
+            self.assertLessEqual(len(context['games']),
+                                 views.GAMES_PER_PAGE)
+            if not context['next_cursor']:
+                break
+            context = self.get_page(after=context['next_cursor'])
+        self.assertEqual([game.id for game in seen],
+                         [game.id for game in expected])
+
+        # And back to the first page
+        while context['previous_cursor']:
+            context = self.get_page(before=context['previous_cursor'])
+        self.assertEqual([game.id for game in context['games']],
+                         [game.id for game in expected[:5]])
+
+    def test2(self):
+        """ The filters are applied in the query """
+        self.loginTestUser(self.client1, self.user1)
+        self.client1.post(reverse(SELECT_GAME_SERVICE),
+                          {"role": "cat", "status": "finished"})
+        context = self.get_page()
+        self.assertEqual(
+            [game.id for game in context['games']],
+            [game.id for game in reversed(self.games)
+             if game.cat_user == self.user1 and
+             game.status == GameStatus.FINISHED])
+
+    def test3(self):
+        """ The cost of a page doesn't depend on the number of games """
+        games, previous_cursor, next_cursor = views.get_games_page(
+            self.user1, 'all', 'all')
+        with self.assertNumQueries(1):
+            games = views.get_games_page(self.user1, 'all', 'all',
+                                         after=next_cursor)[0]
+            # The users come in the same query
+            for game in games:
+                str(game)
+
+
+class ReplayMovesTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.moves = [[0, 9], [59, 50], [2, 11]]
+        for i, (origin, target) in enumerate(self.moves):
+            Move.objects.create(game=self.game,
+                                player=self.user2 if i % 2 else self.user1,
+                                origin=origin, target=target)
+        self.url = reverse(REPLAY_MOVES_SERVICE,
+                           kwargs={'game_id': self.game.id})
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test1(self):
+        """ Every move comes in one response """
+        self.loginTestUser(self.client1, self.user1)
+        response = self.client1.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(self.decode(response.content))
+        self.assertEqual(data["moves"], self.moves)
+        # The game can still change
+        self.assertNotIn("ETag", response)
+
+    def test2(self):
+        """ The moves of a finished game are cached """
+        self.game.status = GameStatus.FINISHED
+        self.game.save()
+        self.loginTestUser(self.client1, self.user1)
+        response = self.client1.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age", response["Cache-Control"])
+
+        with self.assertNumQueries(3):
+            # Session, user and game status, but no moves
+            response = self.client1.get(
+                self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"],
+                         '"replay-%d-%d"' % (self.game.id, self.game.version))
+        self.assertIn("max-age", response["Cache-Control"])
+
+    def test3(self):
+        """ Moves of a game that doesn't exist """
+        self.loginTestUser(self.client1, self.user1)
+        response = self.client1.get(
+            reverse(REPLAY_MOVES_SERVICE, kwargs={'game_id': 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test4(self):
+        """ The moves of a packed game are the same """
+        self.game.status = GameStatus.FINISHED
+        self.game.save()
+        call_command("pack_moves", "--prune", stdout=StringIO())
+        self.assertEqual(self.game.moves.count(), 0)
+        self.loginTestUser(self.client1, self.user1)
+        data = json.loads(self.decode(self.client1.get(self.url).content))
+        self.assertEqual(data["moves"], self.moves)
+
+    def test5(self):
+        """ The board after any move of the replay """
+        self.loginTestUser(self.client1, self.user1)
+        url = reverse(REPLAY_POSITION_SERVICE,
+                      kwargs={'game_id': self.game.id, 'ply': 2})
+        data = json.loads(self.decode(self.client1.get(url).content))
+        self.assertEqual(data["cat_cells"], [2, 4, 6, 9])
+        self.assertEqual(data["mouse"], 50)
+        self.assertTrue(data["cat_turn"])
+
+        url = reverse(REPLAY_POSITION_SERVICE,
+                      kwargs={'game_id': self.game.id, 'ply': 4})
+        self.assertEqual(self.client1.get(url).status_code, 404)
+
+
+@override_settings(LONG_POLL_TIMEOUT=0.3, LONG_POLL_CHECK=0.1)
+class WaitMoveTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        # The ids of the games are used again after each test
+        hub.clear()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.url = reverse(WAIT_MOVE_SERVICE,
+                           kwargs={'game_id': self.game.id})
+        self.loginTestUser(self.client1, self.user1)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def wait(self, version):
+        response = self.client1.get(self.url, {"version": version})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(self.decode(response.content))
+
+    def test1(self):
+        """ Every move increases the version and publishes the state """
+        self.assertEqual(self.game.version, 0)
+        Move.objects.create(game=self.game, player=self.user1,
+                            origin=0, target=9)
+        self.assertEqual(Game.objects.get(id=self.game.id).version, 1)
+        state = hub.wait(self.game.id, 0, 0)
+        self.assertEqual(state["version"], 1)
+        self.assertEqual(state["cat_cells"], [2, 4, 6, 9])
+        self.assertEqual(state["move"], [0, 9])
+        self.assertFalse(state["cat_turn"])
+
+    def test2(self):
+        """ An old version is answered at once """
+        Move.objects.create(game=self.game, player=self.user1,
+                            origin=0, target=9)
+        start = time.monotonic()
+        data = self.wait(0)
+        self.assertEqual(data["version"], 1)
+        self.assertTrue(data["changed"])
+        self.assertEqual(data["state"]["mouse"], 59)
+        self.assertLess(time.monotonic() - start, 0.3)
+
+    def test3(self):
+        """ Without moves the request ends after the timeout """
+        start = time.monotonic()
+        data = self.wait(0)
+        self.assertEqual(data["version"], 0)
+        self.assertFalse(data["changed"])
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+    def test4(self):
+        """ A move published while waiting wakes up the waiter """
+        state = dict(self.game.get_state(), version=3)
+        timer = threading.Timer(0.05, hub.store, (state,))
+        timer.start()
+        self.assertEqual(hub.wait(self.game.id, 2, 5)["version"], 3)
+        timer.join()
+
+
+class WatchGameTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.spectator = User.objects.create_user(
+            username="spectator", password="spectator_pass")
+        self.loginTestUser(self.client1, self.spectator)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test1(self):
+        """ Any user can watch an active game """
+        response = self.client1.get(reverse(WATCH_GAMES_SERVICE))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, reverse(WATCH_GAME_SERVICE,
+                              kwargs={'game_id': self.game.id}))
+
+        response = self.client1.get(
+            reverse(WATCH_GAME_SERVICE, kwargs={'game_id': self.game.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["board"],
+                         self.game.get_game_cells())
+        # The board is not a form
+        self.assertNotContains(response, "new_move_form")
+
+    def test2(self):
+        """ Games that didn't start can't be watched """
+        game = Game.objects.create(cat_user=self.user1)
+        response = self.client1.get(
+            reverse(WATCH_GAME_SERVICE, kwargs={'game_id': game.id}))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.set_game_in_session(self.client1, self.user1, self.game.id)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def get(self, service, etag=None):
+        if etag is None:
+            return self.client1.get(reverse(service))
+        return self.client1.get(reverse(service), HTTP_IF_NONE_MATCH=etag)
+
+    def test1(self):
+        """ The board is not rendered again until the game changes """
+        response = self.get(SHOW_GAME_SERVICE)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        response = self.get(SHOW_GAME_SERVICE, etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        Move.objects.create(game=self.game, player=self.user1,
+                            origin=0, target=9)
+        response = self.get(SHOW_GAME_SERVICE, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test2(self):
+        """ Each user has its own version of the board """
+        etag = self.get(SHOW_GAME_SERVICE)["ETag"]
+        self.set_game_in_session(self.client1, self.user2, self.game.id)
+        response = self.get(SHOW_GAME_SERVICE, etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test3(self):
+        """ The list of games changes with the games and the filter """
+        etag = self.get(SELECT_GAME_SERVICE)["ETag"]
+        self.assertEqual(self.get(SELECT_GAME_SERVICE, etag).status_code,
+                         304)
+
+        self.game.status = GameStatus.FINISHED
+        self.game.save()
+        response = self.get(SELECT_GAME_SERVICE, etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        self.client1.post(reverse(SELECT_GAME_SERVICE),
+                          {"role": "mouse", "status": "all"})
+        self.assertEqual(self.get(SELECT_GAME_SERVICE, etag).status_code,
+                         200)
+
+
+class GameStateTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.url = reverse(GAME_STATE_SERVICE,
+                           kwargs={'game_id': self.game.id})
+        self.loginTestUser(self.client1, self.user1)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test1(self):
+        """ The state is the bitboard of the cats, the mouse and the turn """
+        response = self.client1.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        state = json.loads(self.decode(response.content))
+        self.assertEqual(state, {
+            "id": self.game.id, "version": 0, "cats": 0b1010101,
+            "cat_cells": [0, 2, 4, 6], "mouse": 59, "cat_turn": True,
+            "status": GameStatus.ACTIVE, "winner": None})
+
+    def test2(self):
+        """ The winner of a finished game """
+        self.game.cat1, self.game.cat2 = 11, 13
+        self.game.cat3, self.game.cat4 = 25, 27
+        self.game.mouse, self.game.cat_turn = 18, False
+        self.game.save()
+        Move.objects.create(game=self.game, player=self.user2,
+                            origin=18, target=9)
+        state = json.loads(self.decode(self.client1.get(self.url).content))
+        self.assertEqual(state["status"], GameStatus.FINISHED)
+        self.assertEqual(state["winner"], "mouse")
+        self.assertEqual(state["version"], 2)
+
+    def test3(self):
+        """ The same version is answered with 304 """
+        etag = self.client1.get(self.url)["ETag"]
+        response = self.client1.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client1.get(
+            reverse(GAME_STATE_SERVICE, kwargs={'game_id': 1000}))
+        self.assertEqual(response.status_code, 404)
+
+
+class AjaxMoveTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        self.set_game_in_session(self.client1, self.user1, self.game.id)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def move(self, origin, target):
+        return self.client1.post(
+            reverse(MOVE_SERVICE),
+            json.dumps({"origin": origin, "target": target}),
+            content_type="application/json")
+
+    def test1(self):
+        """ The answer of a move is the move and the new state """
+        response = self.move(0, 9)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(self.decode(response.content))
+        self.assertEqual(data["moves"], [[0, 9]])
+        self.assertEqual(data["state"]["cat_cells"], [2, 4, 6, 9])
+        self.assertEqual(data["state"]["version"], 1)
+        self.assertFalse(data["state"]["cat_turn"])
+
+    def test2(self):
+        """ A wrong move is answered with the error and the state """
+        response = self.move(0, 18)
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(self.decode(response.content))
+        self.assertEqual(data["error"], constants.MSG_ERROR_MOVE)
+        self.assertEqual(data["state"]["version"], 0)
+        self.assertEqual(self.game.moves.count(), 0)
+
+    def test3(self):
+        """ The answer of the bot comes with the move """
+        self.client1.get(reverse(CREATE_BOT_GAME_SERVICE,
+                                 kwargs={"role": "cat"}))
+        data = json.loads(self.decode(self.move(0, 9).content))
+        self.assertEqual(len(data["moves"]), 2)
+        self.assertEqual(data["moves"][1][0], 59)
+        self.assertTrue(data["state"]["cat_turn"])
+
+    def test4(self):
+        """ A form without JSON is still redirected to the board """
+        response = self.client1.post(reverse(MOVE_SERVICE),
+                                     {"origin": 0, "target": 9})
+        self.assertRedirects(response, reverse(SHOW_GAME_SERVICE))
+
+    def test5(self):
+        """ If the bot fails, the move of the player is still answered as
+        done """
+        self.client1.get(reverse(CREATE_BOT_GAME_SERVICE,
+                                 kwargs={"role": "cat"}))
+        with mock.patch.object(ai, "choose_move",
+                               side_effect=RuntimeError("broken")), \
+                self.assertLogs("logic.views", "ERROR"):
+            response = self.move(0, 9)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(self.decode(response.content))
+        self.assertEqual(data["moves"], [[0, 9]])
+        self.assertFalse(data["state"]["cat_turn"])
+        self.assertEqual(data["state"]["version"], 1)
+
+
+class ExportServiceTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        Move.objects.create(game=game, player=self.user1,
+                            origin=0, target=9)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test1(self):
+        """ Only the staff can export the games """
+        self.loginTestUser(self.client1, self.user1)
+        response = self.client1.get(reverse(EXPORT_SERVICE))
+        self.assertEqual(response.status_code, 302)
+
+        self.user1.is_staff = True
+        self.user1.save()
+        response = self.client1.get(reverse(EXPORT_SERVICE),
+                                    {"format": "ndjson"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["moves"], [[0, 9]])
+
+        response = self.client1.get(reverse(EXPORT_SERVICE),
+                                    {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+class LeaderboardTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+
+    def test1(self):
+        """ The users with more wins first """
+        UserStats.objects.create(user=self.user1, played=3, wins=1)
+        UserStats.objects.create(user=self.user2, played=3, wins=2)
+        self.loginTestUser(self.client1, self.user1)
+        response = self.client1.get(reverse(LEADERBOARD_SERVICE))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([stats.user for stats in response.context["stats"]],
+                         [self.user2, self.user1])
+
+
+class MetricsTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        metrics.registry.histograms.clear()
+
+    def tearDown(self):
+        super().tearDown()
+
+    def get_metrics(self):
+        response = self.client1.get(reverse(METRICS_SERVICE))
+        self.assertEqual(response.status_code, 200)
+        return self.decode(response.content)
+
+    def test1(self):
+        """ The requests of each view are counted """
+        self.loginTestUser(self.client1, self.user1)
+        for _ in range(3):
+            self.client1.get(reverse(SELECT_GAME_SERVICE))
+        text = self.get_metrics()
+        self.assertIn("# TYPE view_request_seconds histogram", text)
+        self.assertIn('view_request_seconds_count{view="select_game"} 3',
+                      text)
+        self.assertIn('view_queries_bucket{view="select_game",le="+Inf"} 3',
+                      text)
+        self.assertIn('view_response_bytes_count{view="select_game"} 3',
+                      text)
+
+    def test2(self):
+        """ The histograms of the other processes are added """
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            self.client1.get(reverse(LANDING_SERVICE))
+            other = metrics.registry.snapshot()
+            with open(os.path.join(directory, "1.json"), "w") as output:
+                json.dump([[name, view, histogram] for (name, view),
+                           histogram in other.items()], output)
+            text = self.get_metrics()
+        self.assertIn('view_request_seconds_count{view="landing"} 2', text)
+
+    def test3(self):
+        """ Only the staff sees the metrics from other addresses """
+        response = self.client1.get(reverse(METRICS_SERVICE),
+                                    REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 403)
+
+    def test4(self):
+        """ The counts of a process that ended are kept when its file is
+        deleted, and the file of a process has its start id """
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            self.client1.get(reverse(LANDING_SERVICE))
+            other = metrics.registry.snapshot()
+            path = os.path.join(directory, "1-old.json")
+            with open(path, "w") as output:
+                json.dump([[name, view, histogram] for (name, view),
+                           histogram in other.items()], output)
+            before = self.get_metrics()
+            # The worker is replaced by a new one with one request
+            old = time.time() - 3 * metrics.STALE_INTERVALS * \
+                metrics.settings.METRICS_WRITE_INTERVAL
+            os.utime(path, (old, old))
+            with open(os.path.join(directory, "2-new.json"), "w") as output:
+                json.dump([[name, view, histogram] for (name, view),
+                           histogram in other.items()], output)
+            after = self.get_metrics()
+            self.assertFalse(os.path.exists(path))
+            self.assertIn(metrics.ENDED_NAME, os.listdir(directory))
+            again = self.get_metrics()
+            metrics.registry.write()
+            self.assertIn(metrics.registry.name, os.listdir(directory))
+        self.assertIn('view_request_seconds_count{view="landing"} 2', before)
+        for text in (after, again):
+            self.assertIn('view_request_seconds_count{view="landing"} 3',
+                          text)
+        self.assertTrue(metrics.registry.name.startswith(
+            "%d-" % os.getpid()))
+
+    def test5(self):
+        """ A streaming response is counted when it ends, with the
+        queries of its body """
+        self.user1.is_staff = True
+        self.user1.save()
+        self.loginTestUser(self.client1, self.user1)
+        Game.objects.create(cat_user=self.user1, mouse_user=self.user2,
+                            status=GameStatus.ACTIVE)
+        response = self.client1.get(reverse(EXPORT_SERVICE))
+        self.assertNotIn('view="export"', metrics.registry.render())
+        size = len(b"".join(response.streaming_content))
+        with CaptureQueriesContext(connection) as queries:
+            list(export.export_lines('ndjson'))
+        body_queries = len(queries.captured_queries)
+        text = self.get_metrics()
+        self.assertIn('view_response_bytes_count{view="export"} 1', text)
+        self.assertIn('view_response_bytes_sum{view="export"} %d' % size,
+                      text)
+        # The session and the user, and the body
+        self.assertIn('view_queries_sum{view="export"} %d' %
+                      (2 + body_queries), text)
+
+
+class BotUsernameTests(tests_services.PlayGameBaseServiceTests):
+    def test1(self):
+        """ Nobody can sign up with the name of the bot """
+        for username in (constants.BOT_USERNAME,
+                         constants.BOT_USERNAME.upper()):
+            form = SignupForm(data={'username': username,
+                                    'password': "Load-test-2019",
+                                    'password2': "Load-test-2019"})
+            self.assertFalse(form.is_valid())
+            self.assertEqual(form.errors['username'],
+                             [constants.MSG_ERROR_RESERVED_USERNAME])
+
+
+class SessionWriteTests(tests_services.PlayGameBaseServiceTests):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            cat_user=self.user1, mouse_user=self.user2,
+            status=GameStatus.ACTIVE)
+        for i, (origin, target) in enumerate([(0, 9), (59, 50), (2, 11)]):
+            Move.objects.create(game=self.game,
+                                player=self.user2 if i % 2 else self.user1,
+                                origin=origin, target=target)
+
+    def tearDown(self):
+        super().tearDown()
+
+    def session_writes(self, *urls):
+        with CaptureQueriesContext(connection) as queries:
+            for url in urls:
+                self.client1.get(url)
+        return [query['sql'] for query in queries.captured_queries
+                if 'django_session' in query['sql'] and
+                not query['sql'].startswith('SELECT')]
+
+    def test1(self):
+        """ Showing pages and the game doesn't write the session """
+        self.set_game_in_session(self.client1, self.user1, self.game.id)
+        # The first list of games stores the default filters
+        self.client1.get(reverse(SELECT_GAME_SERVICE))
+        self.assertEqual(self.session_writes(
+            reverse(LANDING_SERVICE), reverse(SELECT_GAME_SERVICE),
+            reverse(SHOW_GAME_SERVICE),
+            reverse(SELECT_GAME_SERVICE, kwargs={'game_id': self.game.id})),
+            [])
+        self.assertNotIn('playhead', self.client1.session)
+
+    def test2(self):
+        """ With the playhead of the client the session is not written """
+        self.set_game_in_session(self.client1, self.user1, self.game.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client1.post(reverse(GET_MOVE_SERVICE),
+                                         {"shift": 1, "playhead": 0})
+        data = json.loads(self.decode(response.content))
+        self.assertEqual([data["origin"], data["target"]], [59, 50])
+        self.assertEqual(data["playhead"], 1)
+        self.assertFalse(any('django_session' in query['sql'] and
+                             not query['sql'].startswith('SELECT')
+                             for query in queries.captured_queries))
+        response = self.client1.post(reverse(GET_MOVE_SERVICE),
+                                     {"shift": 1, "playhead": 5})
+        self.assertEqual(response.status_code, 404)
+
+    def test3(self):
+        """ Another game or the replay page start the replay again """
+        self.set_game_in_session(self.client1, self.user1, self.game.id)
+        self.client1.post(reverse(GET_MOVE_SERVICE), {"shift": 1})
+        self.assertEqual(self.client1.session['playhead'], 0)
+        self.client1.get(reverse(REPLAY_SERVICE))
+        self.assertNotIn('playhead', self.client1.session)
+
+        self.client1.post(reverse(GET_MOVE_SERVICE), {"shift": 1})
+        other = Game.objects.create(cat_user=self.user1,
+                                    mouse_user=self.user2,
+                                    status=GameStatus.ACTIVE)
+        self.client1.get(reverse(SELECT_GAME_SERVICE,
+                                 kwargs={'game_id': other.id}))
+        self.assertEqual(self.client1.session['game_id'], other.id)
+        self.assertNotIn('playhead', self.client1.session)
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test1(self):
+        """ A simulated user signs up and reads a game through the server """
+        stats = loadtest.Stats()
+        player = loadtest.Player(self.live_server_url, "loadtest_0_cat",
+                                 stats, 5)
+        player.signup()
+        self.assertTrue(User.objects.filter(username="loadtest_0_cat")
+                        .exists())
+        game = Game.objects.create(cat_user=User.objects.get(
+            username="loadtest_0_cat"))
+        self.assertEqual(player.get_state(game.id)["status"],
+                         GameStatus.CREATED)
+        self.assertEqual(len(stats.times["signup"]), 1)
+        self.assertEqual(len(stats.times["game_state"]), 1)
+        self.assertEqual(sum(stats.errors.values()), 0)
+
+    def test2(self):
+        """ The percentiles are the nearest rank """
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertEqual(loadtest.percentile([], 50), 0.0)
+
+    def test3(self):
+        """ The report has a line per endpoint and the total """
+        stats = loadtest.Stats()
+        for seconds in (0.01, 0.02, 0.03):
+            stats.add("move", seconds, False)
+        stats.add("show_game", 0.5, True)
+        stats.add_game("mouse")
+        lines = loadtest.report(stats, 2)
+        self.assertEqual(lines[0].split(), ["endpoint", "requests", "errors",
+                                            "req/s", "p50", "ms", "p95",
+                                            "ms", "p99", "ms"])
+        self.assertEqual(lines[1].split(), ["move", "3", "0", "1.5", "20.0",
+                                            "30.0", "30.0"])
+        self.assertEqual(lines[2].split()[:3], ["show_game", "1", "1"])
+        self.assertEqual(lines[3].split(), ["total", "4", "1", "2.0"])
+        self.assertEqual(lines[4], "games: mouse 1 in 2.0 s")
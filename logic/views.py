@@ -1,18 +1,64 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.http import HttpResponseForbidden, HttpResponseNotFound
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django.shortcuts import render
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q, Sum
+from django.middleware.csrf import get_token
+import hashlib
 import json
+import logging
+import time
 
-from datamodel import constants
-from datamodel.models import Game, Move, Counter, GameStatus
+from datamodel import ai, bitboard, constants, export
+from datamodel.hub import hub
+from datamodel.models import Game, Move, Counter, GameStatus, UserStats
+from logic import metrics
 from logic.forms import SignupForm, LogInForm, MoveForm
 
+logger = logging.getLogger(__name__)
+
+GAMES_PER_PAGE = 5
+WATCH_GAMES = 20
+LEADERBOARD_SIZE = 10
+# A finished game never changes
+REPLAY_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'private, no-cache'
+
+
+def page_etag(request, *parts):
+    """ ETag of a page from the data it shows. The user and the CSRF
+    token of its forms are part of it """
+    get_token(request)
+    key = [request.user.id, request.META.get('CSRF_COOKIE')] + list(parts)
+    return '"%s"' % hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+
+
+def not_modified(request, etag):
+    # 304 response if the browser has the page of this etag
+    if request.method != 'GET':
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_etag(response, etag)
+    return response
+
+
+def set_etag(response, etag):
+    if etag is not None:
+        response['ETag'] = etag
+        # The browser asks before using its copy
+        response['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
 
 def anonymous_required(f):
     def wrapped(request):
@@ -32,7 +78,6 @@ def errorHTTP(request, exception=None):
 
 
 def index(request):
-    request.session['playhead'] = -1
     if request.user.is_authenticated:
         return redirect(reverse('select_game'))
     return redirect(reverse('login'))
@@ -40,7 +85,6 @@ def index(request):
 
 @anonymous_required
 def login_service(request):
-    request.session['playhead'] = -1
     user_form = LogInForm()
     if request.method == 'POST':
         user_form = LogInForm(data=request.POST)
@@ -57,14 +101,12 @@ def login_service(request):
 
 @login_required
 def logout_service(request):
-    request.session['playhead'] = -1
     logout(request)
     return redirect(reverse('index'))
 
 
 @anonymous_required
 def signup_service(request):
-    request.session['playhead'] = -1
     user_form = SignupForm()
     if request.method == 'POST':
         user_form = SignupForm(data=request.POST)
@@ -82,7 +124,6 @@ def signup_service(request):
 
 
 def counter_service(request):
-    request.session['playhead'] = -1
     # If there is no counter we create it
     if 'counter' not in request.session:
         request.session['counter'] = 1
@@ -99,40 +140,109 @@ def counter_service(request):
 
 @login_required
 def create_game_service(request):
-    request.session['playhead'] = -1
     # create the game
     game = Game(cat_user=request.user)
     game.save()
     return render(request, "mouse_cat/new_game.html", {'game': game})
 
 
+@login_required
+def create_bot_game_service(request, role):
+    if role not in ('cat', 'mouse'):
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+
+    # The bot takes the other role and the game starts at once
+    bot = ai.get_bot_user()
+    if role == 'cat':
+        game = Game(cat_user=request.user, mouse_user=bot)
+    else:
+        game = Game(cat_user=bot, mouse_user=request.user)
+    game.save()
+    play_bot_reply(game)
+
+    select_game_in_session(request, game.id)
+    return redirect(reverse('show_game'))
+
+
 @login_required
 def join_game_service(request):
-    request.session['playhead'] = -1
-    # If there are no games to join, render error message
-    if Game.objects.count() == 0:
+    # Take the newest open game of another user. If there are no games to
+    # join, render error message
+    if Game.objects.join(request.user) is None:
         return render(request, "mouse_cat/join_game.html",
                       {'msg_error': "No games to join! Let a cat start a game first!"})
 
-    # Get game with greater id
-    games = Game.objects.filter(mouse_user=None)
-    id_game = max((game.id for game in list(
-        filter(lambda g: g.cat_user != request.user, games))), default=None)
-    if id_game is None:
-        return render(request, "mouse_cat/join_game.html",
-                      {'msg_error': "No games to join! Let a cat start a game first!"})
+    return redirect(reverse('select_game'))
 
-    game = Game.objects.get(id=id_game)
 
-    # User joins the game
-    game.mouse_user = request.user
-    game.save()
-    return redirect(reverse('select_game'))
+def select_game_in_session(request, game_id):
+    # The session is only written when the game changes. The playhead of
+    # the replay belongs to the game that was selected
+    if request.session.get('game_id') != game_id:
+        request.session['game_id'] = game_id
+        request.session.pop('playhead', None)
+
+
+def parse_cursor(cursor):
+    # The cursor of a game in the list is "<status>-<id>"
+    try:
+        status, game_id = cursor.split('-')
+        return int(status), int(game_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_games_query(user, role, status):
+    # Started games of a user, filtered by role and status
+    if role == 'cat':
+        query = Q(cat_user=user)
+    elif role == 'mouse':
+        query = Q(mouse_user=user)
+    else:
+        query = Q(cat_user=user) | Q(mouse_user=user)
+    if status == 'active':
+        statuses = [GameStatus.ACTIVE]
+    elif status == 'finished':
+        statuses = [GameStatus.FINISHED]
+    else:
+        statuses = [GameStatus.ACTIVE, GameStatus.FINISHED]
+    return Game.objects.filter(query, status__in=statuses)
+
+
+def get_games_page(user, role, status, after=None, before=None):
+    """ Games of a user ordered by status (active first) and newest id,
+    and the cursors of the previous and next pages. The page starts after
+    the cursor `after` or ends before the cursor `before` (keyset
+    pagination), so its cost doesn't depend on the number of games """
+    games = get_games_query(user, role, status) \
+        .select_related('cat_user', 'mouse_user')
+    after, before = parse_cursor(after), parse_cursor(before)
+    if before:
+        games = games.filter(Q(status__lt=before[0]) |
+                             Q(status=before[0], id__gt=before[1]))
+        page = list(games.order_by('-status', 'id')[:GAMES_PER_PAGE + 1])
+        has_previous, has_next = len(page) > GAMES_PER_PAGE, True
+        page = page[:GAMES_PER_PAGE]
+        page.reverse()
+    else:
+        if after:
+            games = games.filter(Q(status__gt=after[0]) |
+                                 Q(status=after[0], id__lt=after[1]))
+        page = list(games.order_by('status', '-id')[:GAMES_PER_PAGE + 1])
+        has_previous, has_next = after is not None, \
+            len(page) > GAMES_PER_PAGE
+        page = page[:GAMES_PER_PAGE]
+
+    previous_cursor = next_cursor = None
+    if page and has_previous:
+        previous_cursor = "%d-%d" % (page[0].status, page[0].id)
+    if page and has_next:
+        next_cursor = "%d-%d" % (page[-1].status, page[-1].id)
+    return page, previous_cursor, next_cursor
 
 
 @login_required
 def select_game_service(request, game_id=-1):
-    request.session['playhead'] = -1
     context_dict = {}
 
     user = request.user
@@ -148,38 +258,35 @@ def select_game_service(request, game_id=-1):
     if 'status' not in request.session:
         request.session['status'] = 'all'
 
-    # Get the pages for the filter
-    pages = []
-    if request.session["role"] == 'cat':
-        if request.session["status"] == 'active' or request.session["status"] == 'all':
-            pages += Game.objects.filter(cat_user=user, status=GameStatus.ACTIVE)
-        if request.session["status"] == 'finished' or request.session["status"] == 'all':
-            pages += Game.objects.filter(cat_user=user, status=GameStatus.FINISHED)
-    elif request.session["role"] == 'mouse':
-        if request.session["status"] == 'active' or request.session["status"] == 'all':
-            pages += Game.objects.filter(mouse_user=user, status=GameStatus.ACTIVE)
-        if request.session["status"] == 'finished' or request.session["status"] == 'all':
-            pages += Game.objects.filter(mouse_user=user, status=GameStatus.FINISHED)
-    else:
-        if request.session["status"] == 'active' or request.session["status"] == 'all':
-            pages += Game.objects.filter(cat_user=user, status=GameStatus.ACTIVE)
-            pages += Game.objects.filter(mouse_user=user, status=GameStatus.ACTIVE)
-        if request.session["status"] == 'finished' or request.session["status"] == 'all':
-            pages += Game.objects.filter(cat_user=user, status=GameStatus.FINISHED)
-            pages += Game.objects.filter(mouse_user=user, status=GameStatus.FINISHED)
-
-    # Makes the pages nice and beautiful
-    paginator = Paginator(pages, 5)  # Show 5 games in a page
-    page = request.GET.get('page')
-    games = paginator.get_page(page)
+    if game_id == -1:
+        # Any new game, move or end of a game of the list changes the
+        # count, the last id or the sum of the versions
+        summary = get_games_query(user, request.session['role'],
+                                  request.session['status']) \
+            .aggregate(Count('id'), Max('id'), Sum('version'))
+        etag = page_etag(request, request.session['role'],
+                         request.session['status'],
+                         request.GET.get('after'), request.GET.get('before'),
+                         sorted(summary.items()))
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+    # One page of games, fetched with a single query
+    games, previous_cursor, next_cursor = get_games_page(
+        user, request.session['role'], request.session['status'],
+        request.GET.get('after'), request.GET.get('before'))
 
     # fill the context_dict
     context_dict['games'] = games
+    context_dict['previous_cursor'] = previous_cursor
+    context_dict['next_cursor'] = next_cursor
     context_dict['role'] = request.session['role']
     context_dict['status'] = request.session['status']
 
     if game_id == -1:
-        return render(request, "mouse_cat/select_game.html", context_dict)
+        return set_etag(render(request, "mouse_cat/select_game.html",
+                               context_dict), etag)
 
     # POST in a bad way
     game = Game.objects.filter(id=game_id).first()
@@ -187,10 +294,10 @@ def select_game_service(request, game_id=-1):
         return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
     else:
         if game.status == GameStatus.FINISHED:
-            request.session['game_id'] = game.id
+            select_game_in_session(request, game.id)
             return redirect(reverse('replay'))
         if game.cat_user == user or game.mouse_user == user:
-            request.session['game_id'] = game.id
+            select_game_in_session(request, game.id)
             return redirect(reverse('show_game'))
         else:
             return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
@@ -198,58 +305,160 @@ def select_game_service(request, game_id=-1):
 
 @login_required
 def get_move_service(request):
-
-    if request.method != 'POST' or "shift" not in request.POST or 'game_id' not in request.session:
+    """ Move of the replay next to the playhead (the last move shown, -1
+    before the first one) and the new playhead. The client sends its
+    playhead; without it the one of the session is used, and the session
+    is only written when it changes """
+    if request.method != 'POST' or "shift" not in request.POST or \
+            'game_id' not in request.session:
         return HttpResponseNotFound()
 
-    if 'playhead' not in request.session:
-        request.session['playhead'] = -1
-
-    shift = int(request.POST.get("shift"))
-    moves = Move.objects.all().filter(game_id=request.session['game_id'])
-    origins = []
-    targets = []
-    prev = True
-    next = True
-    for move in moves:
-        origins.append(move.origin)
-        targets.append(move.target)
+    try:
+        shift = int(request.POST["shift"])
+        playhead = int(request.POST.get("playhead",
+                                        request.session.get('playhead', -1)))
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    # The moves of a packed game are not Move rows
+    game = Game.objects.only('packed_moves') \
+        .get(id=request.session['game_id'])
+    moves = game.get_moves()
+    if not moves or not -1 <= playhead < len(moves):
+        return HttpResponseNotFound()
 
+    previous = True
+    following = True
     if shift >= 0:
-        request.session['playhead'] += int(shift)
-        if request.session['playhead'] == len(origins)-1:
-            next = False
-        if request.session['playhead'] >= len(origins):
-            request.session['playhead'] -= int(shift)
-        dict = {'origin': origins[request.session['playhead']], 'target': targets[request.session['playhead']], 'previous': prev, 'next': next}
+        playhead += shift
+        if playhead == len(moves) - 1:
+            following = False
+        if playhead >= len(moves):
+            playhead -= shift
+        origin, target = moves[playhead]
     else:
-        if request.session['playhead'] <= 0:
-            prev = False
-        if request.session['playhead'] < 0:
-            request.session['playhead'] = 0
-        dict = {'origin': targets[request.session['playhead']], 'target': origins[request.session['playhead']], 'previous': prev, 'next': next}
-        request.session['playhead'] += int(shift)
-    return JsonResponse(dict)
+        if playhead <= 0:
+            previous = False
+        if playhead < 0:
+            playhead = 0
+        target, origin = moves[playhead]
+        playhead += shift
+
+    if "playhead" not in request.POST and \
+            request.session.get('playhead') != playhead:
+        request.session['playhead'] = playhead
+    return JsonResponse({'origin': origin, 'target': target,
+                         'previous': previous, 'next': following,
+                         'playhead': playhead})
 
 
 @login_required
 def show_game_service(request):
-    request.session['playhead'] = -1
     context_dict = {}
 
     if 'game_id' not in request.session:
         return redirect(reverse('index'))
 
-    game = Game.objects.get(id=request.session['game_id'])
-    if game.mouse_is_trapped() or game.mouse_at_top():
-        game.status = GameStatus.FINISHED
-        game.save()
+    # The end of the game is saved with the move that finishes it
+    game = Game.objects.select_related('cat_user', 'mouse_user') \
+        .get(id=request.session['game_id'])
+
+    # The page only changes with the version of the game, unless it shows
+    # the error of a move
+    etag = None
+    if not len(messages.get_messages(request)):
+        etag = page_etag(request, game.id, game.version)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
 
     context_dict['game'] = game
     context_dict['board'] = game.get_game_cells()
     context_dict['move_form'] = MoveForm()
 
-    return render(request, "mouse_cat/game.html", context_dict)
+    return set_etag(render(request, "mouse_cat/game.html", context_dict),
+                    etag)
+
+
+@login_required
+def wait_move_service(request, game_id):
+    """ Long poll: answers with the state of the game (see Game.get_state)
+    as soon as it has a newer version than the one the client has, or
+    after settings.LONG_POLL_TIMEOUT seconds. The state comes from the
+    hub, so the players and every spectator of a game share one read of
+    the DB each settings.LONG_POLL_CHECK seconds, and none if the moves
+    are published to this process """
+    try:
+        version = int(request.GET.get('version', -1))
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    def load():
+        return Game.objects.get_state(game_id)
+
+    deadline = time.monotonic() + settings.LONG_POLL_TIMEOUT
+    while True:
+        state = hub.get_state(game_id, load, settings.LONG_POLL_CHECK)
+        if state is None:
+            return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+        remaining = deadline - time.monotonic()
+        if state['version'] > version or remaining <= 0:
+            break
+        known = hub.wait(game_id, version,
+                         min(settings.LONG_POLL_CHECK, remaining))
+        if known is not None and known['version'] > version:
+            state = known
+            break
+
+    return JsonResponse({'version': state['version'],
+                         'changed': state['version'] > version,
+                         'state': state})
+
+
+@login_required
+def game_state_service(request, game_id):
+    """ State of a game (see Game.get_state) as a small JSON document,
+    read with one query and without rendering the board """
+    state = Game.objects.get_state(game_id)
+    if state is None:
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+
+    etag = '"state-%d-%d"' % (game_id, state['version'])
+    response = not_modified(request, etag)
+    if response is None:
+        response = JsonResponse(state,
+                                json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = etag
+    response['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
+
+@login_required
+def leaderboard_service(request):
+    """ The users with more wins """
+    stats = UserStats.objects.leaderboard(LEADERBOARD_SIZE)
+    return render(request, "mouse_cat/leaderboard.html", {'stats': stats})
+
+
+@login_required
+def watch_games_service(request):
+    """ The newest active games, to watch them """
+    games = Game.objects.filter(status=GameStatus.ACTIVE) \
+        .select_related('cat_user', 'mouse_user') \
+        .order_by('-id')[:WATCH_GAMES]
+    return render(request, "mouse_cat/watch_games.html", {'games': games})
+
+
+@login_required
+def watch_game_service(request, game_id):
+    """ Read-only board of a game that follows its moves """
+    game = Game.objects.select_related('cat_user', 'mouse_user') \
+        .filter(id=game_id).exclude(status=GameStatus.CREATED).first()
+    if game is None:
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+
+    context_dict = {'game': game, 'board': game.get_game_cells()}
+    return render(request, "mouse_cat/watch_game.html", context_dict)
 
 
 @login_required
@@ -259,15 +468,144 @@ def replay_service(request):
     if 'game_id' not in request.session:
         return redirect(reverse('index'))
 
+    # The replay starts again from the first move. Only a playhead left
+    # by get_move writes the session
+    request.session.pop('playhead', None)
     game = Game.objects.get(id=request.session['game_id'])
     context_dict['game'] = game
     context_dict['board'] = game.get_game_initial_cells()
     return render(request, "mouse_cat/replay.html", context_dict)
 
 
+def replay_etag(game, *parts):
+    # The version (a new one with each move) tells apart the games that
+    # could have had the same id, not only the id
+    return '"%s"' % "-".join(
+        str(part) for part in ("replay", game.id, game.version) + parts)
+
+
+@login_required
+def replay_moves_service(request, game_id):
+    """ Every move of a game as [[origin, target], ...], for the replay
+    page to step through them without more requests. A finished game
+    doesn't change, so its moves are cached by the browser """
+    game = Game.objects.filter(id=game_id) \
+        .only('status', 'cat_wins', 'packed_moves', 'version').first()
+    if not game:
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+
+    finished = game.status == GameStatus.FINISHED
+    etag = replay_etag(game)
+    if finished:
+        response = not_modified(request, etag)
+        if response is not None:
+            response['Cache-Control'] = REPLAY_CACHE_CONTROL
+            return response
+
+    response = JsonResponse({'moves': [list(move)
+                                       for move in game.get_moves()],
+                             'cat_wins': game.cat_wins},
+                            json_dumps_params={'separators': (',', ':')})
+    if finished:
+        response['ETag'] = etag
+        response['Cache-Control'] = REPLAY_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
+
+def move_form_is_valid(movement):
+    try:
+        return movement.is_valid()
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def play_bot_reply(game):
+    """ The move of the bot if it is its turn. The move before it is
+    already committed, so a failure of the bot is only logged and the
+    game is left as it is """
+    try:
+        return ai.play_bot_move(game)
+    except Exception:
+        logger.exception("The bot could not move in the game %d", game.id)
+        game.refresh_from_db()
+        return None
+
+
+def move_result(game, moves, error):
+    """ Answer to a move sent by the board script: the moves applied (the
+    one of the player and the answer of the bot) and the state of the
+    game after them, or the error and the current state """
+    if error is None:
+        return JsonResponse({'moves': moves, 'state': game.get_state()})
+    status = 409 if error.code == 'conflict' else 400
+    return JsonResponse({'error': error.messages[0],
+                         'state': Game.objects.get_state(game.id)},
+                        status=status)
+
+
+@login_required
+def replay_position_service(request, game_id, ply):
+    """ Board of a game after `ply` moves, to jump to any move of the
+    replay without stepping through the ones before """
+    game = Game.objects.filter(id=game_id).first()
+    if not game:
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+
+    finished = game.status == GameStatus.FINISHED
+    etag = replay_etag(game, ply)
+    if finished:
+        response = not_modified(request, etag)
+        if response is not None:
+            response['Cache-Control'] = REPLAY_CACHE_CONTROL
+            return response
+
+    try:
+        position = game.get_position(ply)
+    except ValueError:
+        position = None
+    if position is None:
+        return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
+    cats, mouse, cat_turn = position
+    response = JsonResponse({'ply': ply, 'cats': cats,
+                             'cat_cells': bitboard.cells(cats),
+                             'mouse': mouse, 'cat_turn': cat_turn})
+    if finished:
+        response['ETag'] = etag
+        response['Cache-Control'] = REPLAY_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response
+
+
+@staff_member_required
+def export_service(request):
+    """ Every game with its moves (see datamodel.export), written while
+    it is read """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest()
+    content_type = 'application/x-ndjson' if export_format == 'ndjson' \
+        else 'text/csv'
+    response = StreamingHttpResponse(export.export_lines(export_format),
+                                     content_type=content_type)
+    response['Content-Disposition'] = \
+        'attachment; filename="games.%s"' % export_format
+    return response
+
+
+def metrics_service(request):
+    """ Histograms of the views (see logic.metrics) for Prometheus """
+    if not request.user.is_staff and \
+            request.META.get('REMOTE_ADDR') not in settings.METRICS_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.render(),
+                        content_type='text/plain; version=0.0.4')
+
+
 @login_required
 def move_service(request):
-    request.session['playhead'] = -1
     # Check if there's a user
     if not request.user:
         return redirect(reverse('login'))
@@ -279,16 +617,41 @@ def move_service(request):
         game = Game.objects.get(id=game_id)
 
         if request.method == 'POST':
-            movement = MoveForm(request.POST)
-            if movement.is_valid():
+            # The board script sends the move as JSON and gets the
+            # result, instead of the redirect to the whole page
+            ajax = request.is_ajax() or \
+                request.content_type == 'application/json'
+            data = request.POST
+            if request.content_type == 'application/json':
+                try:
+                    data = json.loads(request.body.decode('utf-8'))
+                except ValueError:
+                    return HttpResponseBadRequest()
+            movement = MoveForm(data)
+            moves = []
+            error = None
+            if move_form_is_valid(movement):
                 try:
-                    Move.objects.create(game=game, player=player,
-                                        origin=int(movement.data['origin']),
-                                        target=int(movement.data['target']))
-                except ValidationError:
-                    print("Error: Invalid move")
+                    move = Move.objects.create(
+                        game=game, player=player,
+                        origin=int(movement.data['origin']),
+                        target=int(movement.data['target']))
+                    moves.append([move.origin, move.target])
+                except ValidationError as err:
+                    # A conflict means the game changed meanwhile, the
+                    # board shown after it is the current one
+                    error = err
+                else:
+                    # If the opponent is the bot, it answers at once
+                    move = play_bot_reply(game)
+                    if move is not None:
+                        moves.append([move.origin, move.target])
             else:
-                print("Error: Invalid move")
+                error = ValidationError(constants.MSG_ERROR_MOVE)
+            if ajax:
+                return move_result(game, moves, error)
+            if error is not None:
+                messages.error(request, error.messages[0])
             return redirect(reverse('show_game'))
 
     return HttpResponseNotFound(constants.ERROR_NOT_FOUND)
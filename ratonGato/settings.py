@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'logic.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -122,3 +123,41 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = 'staticfiles'
+
+# Solved positions of the game, built with "manage.py build_tablebase"
+TABLEBASE_PATH = os.path.join(BASE_DIR, 'tablebase.bin')
+
+# Times of "manage.py benchmark --save", and how much slower than them
+# (a fraction) a benchmark can run before it is a regression
+BENCHMARK_BASELINE = os.path.join(BASE_DIR, 'benchmark.json')
+BENCHMARK_THRESHOLD = 0.2
+
+# Seconds the built-in player thinks each move
+BOT_MOVE_TIME = 0.2
+
+# Rows of the global counter. With more than one, each hit increases one
+# of them at random and the value shown is their sum
+COUNTER_SHARDS = 1
+
+# Write-behind global counter: each process adds its hits in memory and
+# writes them every COUNTER_FLUSH_HITS hits or COUNTER_FLUSH_INTERVAL s
+COUNTER_BUFFER = False
+COUNTER_FLUSH_HITS = 100
+COUNTER_FLUSH_INTERVAL = 1.0
+
+# Long poll of the game page: seconds a request waits for a move, and
+# seconds between checks of the DB for moves of other processes
+LONG_POLL_TIMEOUT = 25
+LONG_POLL_CHECK = 2
+
+# Directory of the sockets the processes use to send each other the moves
+# of the games, so their long polls don't read the DB. None: each process
+# only reads the DB every LONG_POLL_CHECK seconds per game
+GAME_HUB_SOCKET_DIR = os.environ.get('GAME_HUB_SOCKET_DIR')
+
+# Histograms of the views shown in /metrics. Each process writes its own
+# to METRICS_DIR every METRICS_WRITE_INTERVAL seconds to add them all.
+# /metrics is shown to the staff and to the addresses of METRICS_IPS
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_WRITE_INTERVAL = 5
+METRICS_IPS = ['127.0.0.1']
@@ -27,12 +27,28 @@ urlpatterns = [
     path('signup/', views.signup_service, name='signup'),
     path('counter/', views.counter_service, name='counter'),
     path('create_game/', views.create_game_service, name='create_game'),
+    path('create_bot_game/<str:role>/',
+         views.create_bot_game_service, name='create_bot_game'),
     path('join_game/', views.join_game_service, name='join_game'),
     path('select_game/', views.select_game_service, name='select_game'),
     path('select_game/<int:game_id>/',
          views.select_game_service, name='select_game'),
     path('show_game/', views.show_game_service, name='show_game'),
+    path('show_game/<int:game_id>/wait/',
+         views.wait_move_service, name='wait_move'),
+    path('api/game/<int:game_id>/',
+         views.game_state_service, name='game_state'),
+    path('leaderboard/', views.leaderboard_service, name='leaderboard'),
+    path('watch/', views.watch_games_service, name='watch_games'),
+    path('watch/<int:game_id>/',
+         views.watch_game_service, name='watch_game'),
     path('get_move/', views.get_move_service, name='get_move'),
     path('replay/', views.replay_service, name='replay'),
+    path('replay/<int:game_id>/moves/',
+         views.replay_moves_service, name='replay_moves'),
+    path('replay/<int:game_id>/ply/<int:ply>/',
+         views.replay_position_service, name='replay_position'),
+    path('export/', views.export_service, name='export'),
+    path('metrics', views.metrics_service, name='metrics'),
     path('move/', views.move_service, name='move')
 ]